@@ -9,6 +9,7 @@ a = Analysis(
     datas=[
         ('templates', 'templates'),
         ('static', 'static'),
+        ('wordlists', 'wordlists'),
         ('favicon.ico', '.'),
     ],
     hiddenimports=[
@@ -22,7 +23,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['tkinter', 'unittest', 'doctest'],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
     cipher=block_cipher,
@@ -1,14 +1,21 @@
-from flask import Flask
+import time
+
+STARTED_AT = time.perf_counter()
+
 from config import Config
-from models import db
-from auth import login_manager
-from routes import main_bp, api_bp
 import os
 import webbrowser
 import threading
-import time
 
 def create_app():
+    from flask import Flask
+    from models import db
+    from auth import login_manager
+    from routes import main_bp, api_bp
+    import storage
+    import metrics
+    import assets
+    
     app = Flask(__name__)
     app.config.from_object(Config)
     
@@ -20,23 +27,80 @@ def create_app():
     app.register_blueprint(api_bp)
     
     with app.app_context():
-        db.create_all()
+        storage.configure_engine(app)
+        metrics.init_app(app)
+        assets.init_app(app)
+        storage.upgrade_schema()
     
     return app
 
+class StartupTimer:
+    def __init__(self):
+        self.last = STARTED_AT
+        self.phases = []
+    
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+    
+    def report(self):
+        total = self.last - STARTED_AT
+        details = ', '.join(f'{phase} {elapsed * 1000:.0f}ms' for phase, elapsed in self.phases)
+        return f'{details}, 总计 {total * 1000:.0f}ms'
+
+class DeferredApp:
+    def __init__(self, timer):
+        self.timer = timer
+        self.app = None
+        self.error = None
+        self.ready = threading.Event()
+    
+    def load(self):
+        try:
+            import flask
+            import routes
+            import backup
+            self.timer.mark('导入')
+            app = create_app()
+            backup.start_scheduler(app)
+            self.timer.mark('初始化')
+            
+            from werkzeug.debug import DebuggedApplication
+            app.debug = True
+            self.app = DebuggedApplication(app, evalex=True)
+            print(f"  启动耗时: {self.timer.report()}")
+        except Exception as e:
+            self.error = e
+            print(f"  启动失败: {e}")
+        finally:
+            self.ready.set()
+    
+    def __call__(self, environ, start_response):
+        self.ready.wait()
+        if self.error:
+            raise self.error
+        return self.app(environ, start_response)
+
 def open_browser():
-    time.sleep(1.5)
     webbrowser.open('http://127.0.0.1:5000')
 
 if __name__ == '__main__':
-    app = create_app()
+    timer = StartupTimer()
+    from werkzeug.serving import make_server
+    
+    deferred = DeferredApp(timer)
+    server = make_server('0.0.0.0', 5000, deferred, threaded=True)
+    timer.mark('监听')
+    
+    threading.Thread(target=open_browser, daemon=True).start()
     
     print("=" * 60)
     print("密码管理器正在启动...")
     print("=" * 60)
     print()
     print("  访问地址: http://127.0.0.1:5000")
-    print(f"  数据库位置: {app.config['DB_PATH']}")
+    print(f"  数据库位置: {Config.DB_PATH}")
     print()
     print("  ⚠️  重要提示:")
     print("  • 请勿关闭此窗口，否则密码管理器将停止运行")
@@ -46,6 +110,11 @@ if __name__ == '__main__':
     print("=" * 60)
     print()
     
-    threading.Thread(target=open_browser, daemon=True).start()
+    threading.Thread(target=deferred.load, daemon=True).start()
     
-    app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
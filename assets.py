@@ -0,0 +1,295 @@
+from flask import request, url_for, Response
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+
+SOURCES = ('static/css/variables.css', 'static/css/components.css', 'static/js/app.js', 'favicon.ico')
+MIMETYPES = {
+    '.css': 'text/css',
+    '.js': 'text/javascript',
+    '.ico': 'image/x-icon'
+}
+HASH_LENGTH = 12
+GZIP_MIN_SIZE = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CSS_TIGHT = re.compile(r'\s*([{};,>])\s*')
+CSS_DELIMITER = re.compile(r'([{};])')
+CSS_SELECTOR_COLON = re.compile(r':\s+')
+CSS_DECLARATION_COLON = re.compile(r'\s*:\s*')
+JS_PUNCTUATION = set('{}()[];,:=<>!&|?+-*/%^~.')
+JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^') | {''}
+JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'delete', 'void', 'in', 'of', 'new', 'throw')
+
+def base_path():
+    if getattr(sys, 'frozen', False):
+        return sys._MEIPASS
+    return os.path.dirname(os.path.abspath(__file__))
+
+def skip_string(source, i):
+    quote = source[i]
+    i += 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+def skip_template(source, i):
+    i += 1
+    while i < len(source) and source[i] != '`':
+        if source[i] == '\\':
+            i += 2
+        elif source.startswith('${', i):
+            i = skip_code(source, i + 2, '}')
+        else:
+            i += 1
+    return i + 1
+
+def skip_code(source, i, closing):
+    depth = 0
+    while i < len(source):
+        c = source[i]
+        if c in '\'"':
+            i = skip_string(source, i)
+        elif c == '`':
+            i = skip_template(source, i)
+        elif c == '{':
+            depth += 1
+            i += 1
+        elif c == closing and depth == 0:
+            return i + 1
+        else:
+            if c == '}':
+                depth -= 1
+            i += 1
+    return i
+
+def skip_regex(source, i):
+    i += 1
+    in_class = False
+    while i < len(source) and source[i] != '\n':
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(source) and source[i].isalpha():
+        i += 1
+    return i
+
+def regex_allowed(output):
+    code = ''.join(output).rstrip()
+    if not code or code[-1] in JS_REGEX_PRECEDERS:
+        return True
+    return re.search(r'\b(?:%s)$' % '|'.join(JS_REGEX_KEYWORDS), code) is not None
+
+def join_js(output, piece):
+    if piece in (' ', '\n'):
+        if not output or output[-1] in (' ', '\n'):
+            if piece == '\n' and output:
+                output[-1] = '\n'
+            return
+        output.append(piece)
+        return
+    
+    if output and output[-1] in (' ', '\n'):
+        previous = output[-2][-1] if len(output) > 1 else ''
+        whitespace = output[-1]
+        first = piece[0]
+        keep = ((previous.isalnum() or previous in '_$') and (first.isalnum() or first in '_$\'"`')
+                or previous in '+-' and first == previous)
+        if whitespace == '\n' and previous not in '{};,(' and first not in '})]':
+            keep = True
+        if not keep and (previous in JS_PUNCTUATION or first in JS_PUNCTUATION):
+            output.pop()
+        elif not keep:
+            output[-1] = ' '
+    output.append(piece)
+
+def minify_js(source):
+    output = []
+    i = 0
+    while i < len(source):
+        c = source[i]
+        if source.startswith('//', i):
+            i = source.find('\n', i)
+            if i < 0:
+                break
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end < 0 else end + 2
+            join_js(output, ' ')
+        elif c in '\'"':
+            end = skip_string(source, i)
+            join_js(output, source[i:end])
+            i = end
+        elif c == '`':
+            end = skip_template(source, i)
+            join_js(output, source[i:end])
+            i = end
+        elif c == '/' and regex_allowed(output):
+            end = skip_regex(source, i)
+            join_js(output, source[i:end])
+            i = end
+        elif c.isspace():
+            end = i
+            while end < len(source) and source[end].isspace():
+                end += 1
+            join_js(output, '\n' if '\n' in source[i:end] else ' ')
+            i = end
+        else:
+            end = i + 1
+            while end < len(source) and not (source[end].isspace() or source[end] in '\'"`/'):
+                end += 1
+            join_js(output, source[i:end])
+            i = end
+    return ''.join(output).strip() + '\n'
+
+def minify_css(source):
+    parts = []
+    i = 0
+    start = 0
+    while i < len(source):
+        c = source[i]
+        if source.startswith('/*', i):
+            parts.append((True, source[start:i]))
+            end = source.find('*/', i + 2)
+            i = start = len(source) if end < 0 else end + 2
+        elif c in '\'"':
+            parts.append((True, source[start:i]))
+            end = skip_string(source, i)
+            parts.append((False, source[i:end]))
+            i = start = end
+        else:
+            i += 1
+    parts.append((True, source[start:]))
+    
+    output = []
+    for index, (is_code, text) in enumerate(parts):
+        output.append(minify_css_code(text, next_css_delimiter(parts, index + 1)) if is_code else text)
+    return ''.join(output).strip().replace(';}', '}') + '\n'
+
+def next_css_delimiter(parts, index):
+    for is_code, text in parts[index:]:
+        match = CSS_DELIMITER.search(text) if is_code else None
+        if match:
+            return match.group()
+    return ''
+
+def minify_css_code(code, trailing):
+    pieces = CSS_DELIMITER.split(re.sub(r'\s+', ' ', code))
+    for index in range(0, len(pieces), 2):
+        delimiter = pieces[index + 1] if index + 1 < len(pieces) else trailing
+        colon = CSS_SELECTOR_COLON if delimiter == '{' else CSS_DECLARATION_COLON
+        pieces[index] = colon.sub(':', pieces[index])
+    return CSS_TIGHT.sub(r'\1', ''.join(pieces))
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+class Asset:
+    def __init__(self, name, body):
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.digest = hashlib.sha256(body).hexdigest()[:HASH_LENGTH]
+        self.path = f'{stem}.{self.digest}{ext}'
+        self.mimetype = MIMETYPES.get(ext, 'application/octet-stream')
+        self.body = body
+        compressed = gzip.compress(body, compresslevel=9, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        self.gzipped = compressed if compressed and len(compressed) < len(body) else None
+
+def build(root=None, minify=True):
+    root = root or base_path()
+    bundle = {}
+    for source in SOURCES:
+        path = os.path.join(root, source)
+        if not os.path.exists(path):
+            continue
+        name = source[len('static/'):] if source.startswith('static/') else source
+        ext = os.path.splitext(name)[1]
+        with open(path, 'rb') as f:
+            body = f.read()
+        if minify and ext in MINIFIERS:
+            body = MINIFIERS[ext](body.decode('utf-8')).encode('utf-8')
+        bundle[name] = Asset(name, body)
+    return bundle
+
+class AssetRegistry:
+    def __init__(self):
+        self.by_name = {}
+        self.by_path = {}
+        self.lock = threading.Lock()
+    
+    def load(self, minify=True):
+        bundle = build(minify=minify)
+        with self.lock:
+            self.by_name = bundle
+            self.by_path = {asset.path: asset for asset in bundle.values()}
+    
+    def get(self, name):
+        return self.by_name.get(name)
+    
+    def lookup(self, path):
+        return self.by_path.get(path)
+    
+    def url(self, name):
+        asset = self.by_name.get(name)
+        if asset is None:
+            return url_for('static', filename=name)
+        return url_for('main.asset', filename=asset.path)
+
+registry = AssetRegistry()
+
+def respond(asset, cache_control=IMMUTABLE_CACHE_CONTROL):
+    body = asset.body
+    headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if asset.gzipped and request.accept_encodings['gzip'] > 0:
+        body = asset.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    response = Response(body, mimetype=asset.mimetype, headers=headers)
+    response.set_etag(asset.digest + ('-gzip' if 'Content-Encoding' in headers else ''))
+    return response.make_conditional(request)
+
+def init_app(app):
+    registry.load(minify=app.config.get('ASSETS_MINIFY', True))
+    app.add_template_global(registry.url, 'asset_url')
+
+def write(bundle, output):
+    manifest = {}
+    for asset in bundle.values():
+        target = os.path.join(output, asset.path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(asset.body)
+        if asset.gzipped:
+            with open(target + '.gz', 'wb') as f:
+                f.write(asset.gzipped)
+        manifest[asset.name] = asset.path
+    with open(os.path.join(output, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint, minify and precompress the static assets')
+    parser.add_argument('--output', default=os.path.join(base_path(), 'build', 'assets'))
+    parser.add_argument('--no-minify', action='store_true')
+    args = parser.parse_args()
+    
+    bundle = build(minify=not args.no_minify)
+    write(bundle, args.output)
+    for asset in bundle.values():
+        gzipped = f'{len(asset.gzipped)} gzip' if asset.gzipped else 'no gzip'
+        print(f'{asset.path}: {len(asset.body)} bytes, {gzipped}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+from models import db, Attachment, AttachmentChunk
+from encryption import encryption_service, attachment_aad
+from urllib.parse import quote
+import struct
+
+CHUNK_SIZE = 64 * 1024
+READ_BATCH_CHUNKS = 16
+CHUNK_HEADER = struct.Struct('<QIB')
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+class AttachmentTooLargeError(Exception):
+    pass
+
+class CorruptAttachmentError(Exception):
+    pass
+
+def seal_chunk(attachment_id, seq, data, final):
+    return encryption_service.encrypt_bytes(CHUNK_HEADER.pack(attachment_id, seq, final) + data)
+
+def open_chunk(attachment_id, seq, token):
+    plaintext = encryption_service.decrypt_bytes(token)
+    chunk_attachment_id, chunk_seq, final = CHUNK_HEADER.unpack_from(plaintext)
+    if (chunk_attachment_id, chunk_seq) != (attachment_id, seq):
+        raise CorruptAttachmentError(f'Attachment {attachment_id} chunk {seq} is out of place')
+    return plaintext[CHUNK_HEADER.size:], bool(final)
+
+def read_chunk(stream):
+    parts = []
+    remaining = CHUNK_SIZE
+    while remaining:
+        part = stream.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b''.join(parts)
+
+def metadata(attachment, name):
+    return {
+        'id': attachment.id,
+        'entry_id': attachment.entry_id,
+        'name': name,
+        'content_type': attachment.content_type,
+        'size': attachment.size,
+        'created_at': attachment.created_at.isoformat()
+    }
+
+def list_for_entry(entry_id):
+    attachments = (Attachment.query
+                   .filter(Attachment.entry_id == entry_id)
+                   .order_by(Attachment.id)
+                   .all())
+    names = encryption_service.decrypt_many(
+        [attachment.name for attachment in attachments],
+        associated_data=[attachment_aad(attachment.id, 'name') for attachment in attachments])
+    return [metadata(attachment, name) for attachment, name in zip(attachments, names)]
+
+def store(entry_id, name, content_type, stream, max_bytes):
+    attachment = Attachment(
+        entry_id=entry_id,
+        name=b'',
+        content_type=content_type or DEFAULT_CONTENT_TYPE,
+        chunk_size=CHUNK_SIZE
+    )
+    db.session.add(attachment)
+    db.session.flush()
+    attachment.name = encryption_service.encrypt_data(name, attachment_aad(attachment.id, 'name'))
+    
+    insert = AttachmentChunk.__table__.insert()
+    size = 0
+    seq = 0
+    data = read_chunk(stream)
+    while True:
+        following = read_chunk(stream) if len(data) == CHUNK_SIZE else b''
+        size += len(data)
+        if size > max_bytes:
+            raise AttachmentTooLargeError(f'Attachments are limited to {max_bytes} bytes')
+        
+        final = not following
+        db.session.execute(insert, {
+            'attachment_id': attachment.id,
+            'seq': seq,
+            'data': seal_chunk(attachment.id, seq, data, final)
+        })
+        seq += 1
+        if final:
+            break
+        data = following
+    
+    attachment.size = size
+    attachment.chunk_count = seq
+    db.session.commit()
+    return attachment
+
+def iter_content(attachment, start, stop):
+    if start >= stop:
+        return
+    
+    first = start // attachment.chunk_size
+    last = (stop - 1) // attachment.chunk_size
+    seq = first
+    while seq <= last:
+        rows = (db.session.query(AttachmentChunk.seq, AttachmentChunk.data)
+                .filter(AttachmentChunk.attachment_id == attachment.id)
+                .filter(AttachmentChunk.seq.between(seq, min(seq + READ_BATCH_CHUNKS - 1, last)))
+                .order_by(AttachmentChunk.seq)
+                .all())
+        for row in rows:
+            if row.seq != seq:
+                raise CorruptAttachmentError(f'Attachment {attachment.id} is missing chunk {seq}')
+            data, final = open_chunk(attachment.id, seq, row.data)
+            if final != (seq == attachment.chunk_count - 1):
+                raise CorruptAttachmentError(f'Attachment {attachment.id} is truncated')
+            
+            offset = seq * attachment.chunk_size
+            yield data[max(start - offset, 0):stop - offset]
+            seq += 1
+        if not rows:
+            raise CorruptAttachmentError(f'Attachment {attachment.id} is missing chunk {seq}')
+
+def content_disposition(name):
+    fallback = name.encode('ascii', 'ignore').decode().replace('"', '').replace('\\', '').strip() or 'attachment'
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name)}"
+
+def delete(attachment_ids):
+    if not attachment_ids:
+        return
+    db.session.execute(AttachmentChunk.__table__.delete().where(
+        AttachmentChunk.attachment_id.in_(attachment_ids)))
+    db.session.execute(Attachment.__table__.delete().where(Attachment.id.in_(attachment_ids)))
+
+def delete_for_entries(entry_ids):
+    attachment_ids = [attachment_id for (attachment_id,) in
+                      db.session.query(Attachment.id).filter(Attachment.entry_id.in_(entry_ids))]
+    delete(attachment_ids)
@@ -0,0 +1,133 @@
+from models import db, Entry, PasswordScore
+from encryption import encryption_service, entry_aad
+from breach import breach_checker
+import strength
+import hashlib
+
+AUDIT_BATCH_SIZE = 500
+WEAK_SCORE = 2
+
+def password_digest(row) -> str:
+    if row.password_fingerprint:
+        return row.password_fingerprint
+    return hashlib.sha256(row.password or b'').hexdigest()[:32]
+
+def iter_entry_batches(*columns):
+    last_id = 0
+    while True:
+        rows = (db.session.query(Entry.id, *columns)
+                .filter(Entry.id > last_id)
+                .order_by(Entry.id)
+                .limit(AUDIT_BATCH_SIZE)
+                .all())
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+def cached_scores():
+    return {row.entry_id: row for row in db.session.query(
+        PasswordScore.entry_id, PasswordScore.password_digest, PasswordScore.score,
+        PasswordScore.guesses_log10, PasswordScore.patterns)}
+
+def score_batch(rows):
+    passwords = encryption_service.decrypt_many([row.password for row in rows], strict=False,
+                                                associated_data=[entry_aad(row.id, 'password') for row in rows])
+    scored = []
+    for row, password in zip(rows, passwords):
+        if password is None:
+            continue
+        result = strength.estimate(password)
+        scored.append({
+            'entry_id': row.id,
+            'password_digest': password_digest(row),
+            'score': result['score'],
+            'guesses_log10': result['guesses_log10'],
+            'patterns': ','.join(result['patterns'])
+        })
+    
+    if scored:
+        db.session.execute(PasswordScore.__table__.delete().where(
+            PasswordScore.entry_id.in_([row['entry_id'] for row in scored])))
+        db.session.execute(PasswordScore.__table__.insert(), scored)
+    return scored
+
+def strength_report(weak_score=WEAK_SCORE):
+    db.session.execute(PasswordScore.__table__.delete().where(
+        PasswordScore.entry_id.not_in(db.select(Entry.id))))
+    db.session.commit()
+    cache = cached_scores()
+    
+    distribution = {score: 0 for score in range(6)}
+    weak = []
+    rescored = 0
+    failed = 0
+    
+    for rows in iter_entry_batches(Entry.title, Entry.username, Entry.password,
+                                   Entry.password_fingerprint):
+        current = {row.id: cache[row.id]._asdict() for row in rows
+                   if row.id in cache and cache[row.id].password_digest == password_digest(row)}
+        stale = [row for row in rows if row.id not in current]
+        if stale:
+            scored = score_batch(stale)
+            rescored += len(scored)
+            failed += len(stale) - len(scored)
+            current.update((item['entry_id'], item) for item in scored)
+            db.session.commit()
+        
+        for row in rows:
+            item = current.get(row.id)
+            if item is None:
+                continue
+            distribution[item['score']] += 1
+            if item['score'] <= weak_score:
+                weak.append({
+                    'id': row.id,
+                    'title': row.title,
+                    'username': row.username,
+                    'score': item['score'],
+                    'guesses_log10': item['guesses_log10'],
+                    'patterns': item['patterns'].split(',') if item['patterns'] else []
+                })
+    
+    weak.sort(key=lambda item: (item['score'], item['guesses_log10']))
+    return {
+        'total': sum(distribution.values()),
+        'rescored': rescored,
+        'failed': failed,
+        'distribution': distribution,
+        'weak': weak
+    }
+
+def breach_report():
+    corpus = breach_checker.current()
+    if corpus is None:
+        return None
+    
+    checked = 0
+    failed = 0
+    breached = []
+    for rows in iter_entry_batches(Entry.title, Entry.username, Entry.url, Entry.password):
+        passwords = encryption_service.decrypt_many([row.password for row in rows], strict=False,
+                                                    associated_data=[entry_aad(row.id, 'password') for row in rows])
+        for row, password in zip(rows, passwords):
+            if password is None:
+                failed += 1
+                continue
+            if not password:
+                continue
+            checked += 1
+            if corpus.contains(password):
+                breached.append({
+                    'id': row.id,
+                    'title': row.title,
+                    'username': row.username,
+                    'url': row.url
+                })
+    
+    return {
+        'corpus_size': corpus.count,
+        'checked': checked,
+        'failed': failed,
+        'breached': breached
+    }
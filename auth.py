@@ -1,6 +1,14 @@
+from flask import current_app
 from flask_login import LoginManager, UserMixin
 from models import db, Config as ConfigModel
-from encryption import encryption_service
+from encryption import encryption_service, KDF_ARGON2ID
+from kdf import login_gate, load_params, LoginBusyError
+from search_index import search_index
+import blind_index
+import fingerprints
+import key_rotation
+import format_migration
+import json
 import os
 
 login_manager = LoginManager()
@@ -19,25 +27,64 @@ def is_setup_complete():
     config = ConfigModel.query.first()
     return config is not None
 
+def wrap_vault_key(config, master_password: str, vault_key: bytes, params: dict, pending_key: bytes = None):
+    salt = os.urandom(16)
+    verifier, wrapping_key = encryption_service.derive_unlock_keys(master_password, salt, params)
+    config.master_password_hash = verifier
+    config.encrypted_vault_key = encryption_service.encrypt_vault_key(vault_key, wrapping_key)
+    if pending_key:
+        config.pending_vault_key = encryption_service.encrypt_vault_key(pending_key, wrapping_key)
+    config.salt = salt
+    config.kdf_version = KDF_ARGON2ID
+    config.kdf_params = json.dumps(params, sort_keys=True)
+
+def unlock_legacy(config, master_password: str):
+    if not encryption_service.verify_master_password(config.master_password_hash, master_password):
+        return None
+    return encryption_service.derive_master_key(master_password, config.salt)
+
+def unlock_argon2id(config, master_password: str):
+    params = json.loads(config.kdf_params)
+    verifier, wrapping_key = encryption_service.derive_unlock_keys(master_password, config.salt, params)
+    if not encryption_service.check_verifier(config.master_password_hash, verifier):
+        return None
+    return wrapping_key
+
+def unwrap_keys(config, master_password: str):
+    unlock = unlock_argon2id if config.kdf_version == KDF_ARGON2ID else unlock_legacy
+    try:
+        wrapping_key = login_gate.run(unlock, config, master_password)
+        if wrapping_key is None:
+            return None
+        vault_key = encryption_service.decrypt_vault_key(config.encrypted_vault_key, wrapping_key)
+        pending_key = None
+        if config.pending_vault_key:
+            pending_key = encryption_service.decrypt_vault_key(config.pending_vault_key, wrapping_key)
+    except LoginBusyError:
+        raise
+    except Exception:
+        return None
+    return wrapping_key, vault_key, pending_key
+
+def activate_keys(vault_key: bytes, pending_key: bytes = None):
+    if pending_key:
+        encryption_service.set_vault_key(pending_key, previous_key=vault_key)
+    else:
+        encryption_service.set_vault_key(vault_key)
+
 def setup_master_password(master_password: str):
     if is_setup_complete():
         raise ValueError("Setup already completed")
     
-    salt = os.urandom(16)
-    master_key = encryption_service.derive_master_key(master_password, salt)
     vault_key = encryption_service.generate_vault_key()
-    encrypted_vault_key = encryption_service.encrypt_vault_key(vault_key, master_key)
-    password_hash = encryption_service.hash_master_password(master_password)
-    
-    config = ConfigModel(
-        master_password_hash=password_hash,
-        encrypted_vault_key=encrypted_vault_key,
-        salt=salt
-    )
+    config = ConfigModel()
+    login_gate.run(wrap_vault_key, config, master_password, vault_key, load_params())
     db.session.add(config)
     db.session.commit()
     
     encryption_service.set_vault_key(vault_key)
+    blind_index.ensure_current()
+    fingerprints.ensure_current()
     
     return True
 
@@ -46,16 +93,59 @@ def verify_and_unlock(master_password: str):
     if not config:
         return False
     
-    if not encryption_service.verify_master_password(config.master_password_hash, master_password):
+    with key_rotation.key_lock:
+        keys = unwrap_keys(config, master_password)
+        if keys is None:
+            return False
+        _, vault_key, pending_key = keys
+        
+        params = load_params()
+        stored_params = json.loads(config.kdf_params) if config.kdf_params else None
+        if config.kdf_version != KDF_ARGON2ID or stored_params != params:
+            login_gate.run(wrap_vault_key, config, master_password, vault_key, params, pending_key)
+            db.session.commit()
+        
+        activate_keys(vault_key, pending_key)
+    
+    search_index.rebuild()
+    blind_index.ensure_current()
+    fingerprints.ensure_current()
+    if pending_key:
+        key_rotation.resume(current_app._get_current_object())
+    else:
+        format_migration.resume(current_app._get_current_object())
+    return True
+
+def change_master_password(current_password: str, new_password: str):
+    config = ConfigModel.query.first()
+    if not config:
         return False
     
-    try:
-        master_key = encryption_service.derive_master_key(master_password, config.salt)
-        vault_key = encryption_service.decrypt_vault_key(config.encrypted_vault_key, master_key)
-        encryption_service.set_vault_key(vault_key)
-        return True
-    except Exception:
+    with key_rotation.key_lock:
+        db.session.refresh(config)
+        keys = unwrap_keys(config, current_password)
+        if keys is None:
+            return False
+        _, vault_key, pending_key = keys
+        login_gate.run(wrap_vault_key, config, new_password, vault_key, load_params(), pending_key)
+        db.session.commit()
+    return True
+
+def start_key_rotation(master_password: str):
+    config = ConfigModel.query.first()
+    if not config:
         return False
+    
+    with key_rotation.key_lock:
+        db.session.refresh(config)
+        keys = unwrap_keys(config, master_password)
+        if keys is None:
+            return False
+        wrapping_key, _, _ = keys
+        key_rotation.begin(current_app._get_current_object(), config, wrapping_key)
+    return True
 
 def lock_vault():
-    encryption_service.clear_vault_key()
+    with key_rotation.key_lock:
+        encryption_service.clear_vault_key()
+    search_index.clear()
@@ -0,0 +1,420 @@
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from models import db
+from encryption import encryption_service, KeyRing, KDF_ARGON2ID
+from config import Config
+from datetime import datetime, timedelta
+import argparse
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import zlib
+
+MANIFEST_VERSION = 1
+CHUNK_PAGES = 16
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.005
+CHECK_INTERVAL_SECONDS = 60
+ID_FORMAT = '%Y%m%dT%H%M%S%fZ'
+ID_PATTERN = re.compile(r'^\d{8}T\d{12}Z$')
+KEY_COLUMNS = ('salt', 'kdf_version', 'kdf_params', 'encrypted_vault_key', 'pending_vault_key')
+
+class BackupError(Exception):
+    pass
+
+class CorruptBackupError(Exception):
+    pass
+
+class BackupKeys:
+    def __init__(self, vault_key: bytes):
+        self.keyring = KeyRing(vault_key)
+        self.chunk_key = hmac.new(vault_key, b'backup-chunk-id', hashlib.sha256).digest()
+        self.manifest_key = hmac.new(vault_key, b'backup-manifest', hashlib.sha256).digest()
+        self.key_id = hmac.new(vault_key, b'backup-key-id', hashlib.sha256).hexdigest()[:16]
+    
+    def chunk_id(self, data: bytes) -> str:
+        return hmac.new(self.chunk_key, data, hashlib.sha256).hexdigest()
+    
+    def sign(self, manifest: dict) -> str:
+        body = {key: value for key, value in manifest.items() if key != 'mac'}
+        encoded = json.dumps(body, sort_keys=True, separators=(',', ':')).encode()
+        return hmac.new(self.manifest_key, encoded, hashlib.sha256).hexdigest()
+
+def chunks_dir(directory):
+    return os.path.join(directory, 'chunks')
+
+def manifests_dir(directory):
+    return os.path.join(directory, 'manifests')
+
+def chunk_path(directory, chunk_id):
+    return os.path.join(chunks_dir(directory), chunk_id[:2], chunk_id)
+
+def manifest_path(directory, backup_id):
+    if not ID_PATTERN.match(backup_id):
+        raise FileNotFoundError(backup_id)
+    return os.path.join(manifests_dir(directory), backup_id + '.json')
+
+def write_atomic(path, data: bytes):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+def snapshot(db_path, target_path):
+    source = sqlite3.connect(db_path, timeout=30)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP)
+        page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        schema_version = target.execute('PRAGMA user_version').fetchone()[0]
+        row = target.execute(f'SELECT {", ".join(KEY_COLUMNS)} FROM config LIMIT 1').fetchone()
+    finally:
+        target.close()
+        source.close()
+    if row is None:
+        raise BackupError('Vault has not been set up')
+    return page_size, schema_version, dict(zip(KEY_COLUMNS, row))
+
+def encode_key_material(material: dict) -> dict:
+    return {name: base64.b64encode(value).decode() if isinstance(value, bytes) else value
+            for name, value in material.items()}
+
+def write_chunk(directory, keys, chunk_id, data: bytes) -> int:
+    path = chunk_path(directory, chunk_id)
+    if os.path.exists(path):
+        return 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sealed = keys.keyring.seal(zlib.compress(data, 6), chunk_id.encode())
+    write_atomic(path, sealed)
+    return len(sealed)
+
+def read_chunk(directory, keys, chunk_id) -> bytes:
+    try:
+        with open(chunk_path(directory, chunk_id), 'rb') as f:
+            sealed = f.read()
+    except FileNotFoundError:
+        raise CorruptBackupError(f'Chunk {chunk_id} is missing')
+    try:
+        data = zlib.decompress(keys.keyring.open(sealed, chunk_id.encode()))
+    except (InvalidTag, zlib.error):
+        raise CorruptBackupError(f'Chunk {chunk_id} is damaged')
+    if not hmac.compare_digest(keys.chunk_id(data), chunk_id):
+        raise CorruptBackupError(f'Chunk {chunk_id} does not match its contents')
+    return data
+
+def create(directory, db_path, vault_key: bytes, keep=0, max_age_days=0) -> dict:
+    keys = BackupKeys(vault_key)
+    os.makedirs(chunks_dir(directory), exist_ok=True)
+    os.makedirs(manifests_dir(directory), exist_ok=True)
+    
+    created_at = datetime.utcnow()
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.snapshot')
+    os.close(fd)
+    try:
+        page_size, schema_version, material = snapshot(db_path, temp_path)
+        digest = hashlib.sha256()
+        chunks = []
+        size = 0
+        stored_bytes = 0
+        with open(temp_path, 'rb') as f:
+            while True:
+                data = f.read(page_size * CHUNK_PAGES)
+                if not data:
+                    break
+                digest.update(data)
+                size += len(data)
+                chunk_id = keys.chunk_id(data)
+                chunks.append(chunk_id)
+                stored_bytes += write_chunk(directory, keys, chunk_id, data)
+    finally:
+        os.remove(temp_path)
+    
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'id': created_at.strftime(ID_FORMAT),
+        'created_at': created_at.isoformat(),
+        'schema_version': schema_version,
+        'page_size': page_size,
+        'chunk_pages': CHUNK_PAGES,
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'chunks': chunks,
+        'stored_bytes': stored_bytes,
+        'key_id': keys.key_id,
+        'key_material': encode_key_material(material)
+    }
+    manifest['mac'] = keys.sign(manifest)
+    path = manifest_path(directory, manifest['id'])
+    write_atomic(path, json.dumps(manifest, indent=2).encode())
+    
+    prune(directory, keep, max_age_days)
+    return manifest
+
+def list_ids(directory):
+    try:
+        names = os.listdir(manifests_dir(directory))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len('.json')] for name in names
+                  if name.endswith('.json') and ID_PATTERN.match(name[:-len('.json')]))
+
+def load_manifest(directory, backup_id) -> dict:
+    with open(manifest_path(directory, backup_id), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def summary(manifest: dict) -> dict:
+    return {
+        'id': manifest['id'],
+        'created_at': manifest['created_at'],
+        'schema_version': manifest['schema_version'],
+        'size': manifest['size'],
+        'chunks': len(manifest['chunks']),
+        'stored_bytes': manifest['stored_bytes']
+    }
+
+def list_backups(directory):
+    backups = []
+    for backup_id in reversed(list_ids(directory)):
+        try:
+            backups.append(summary(load_manifest(directory, backup_id)))
+        except (OSError, ValueError, KeyError):
+            backups.append({'id': backup_id, 'error': 'Unreadable manifest'})
+    return backups
+
+def check_manifest(keys, manifest: dict):
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise CorruptBackupError(f"Unsupported backup format {manifest.get('version')}")
+    if manifest.get('key_id') != keys.key_id:
+        raise CorruptBackupError('Backup was made with a different vault key')
+    if not hmac.compare_digest(keys.sign(manifest), manifest.get('mac', '')):
+        raise CorruptBackupError('Backup manifest has been modified')
+
+def check_integrity(path):
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        connection.close()
+    if result != 'ok':
+        raise CorruptBackupError(f'Restored database failed the integrity check: {result}')
+
+def restore(directory, backup_id, vault_key: bytes, output, force=False) -> dict:
+    keys = BackupKeys(vault_key)
+    manifest = load_manifest(directory, backup_id)
+    check_manifest(keys, manifest)
+    if os.path.exists(output) and not force:
+        raise BackupError(f'{output} already exists')
+    
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), suffix='.restore')
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as f:
+            for chunk_id in manifest['chunks']:
+                data = read_chunk(directory, keys, chunk_id)
+                digest.update(data)
+                size += len(data)
+                f.write(data)
+        if size != manifest['size'] or digest.hexdigest() != manifest['sha256']:
+            raise CorruptBackupError('Restored database does not match the backup checksum')
+        check_integrity(temp_path)
+        
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(output + suffix):
+                os.remove(output + suffix)
+        os.replace(temp_path, output)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return summary(manifest)
+
+def verify(directory, backup_id, vault_key: bytes) -> dict:
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.verify')
+    os.close(fd)
+    try:
+        return restore(directory, backup_id, vault_key, temp_path, force=True)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def prune(directory, keep=0, max_age_days=0):
+    backup_ids = list_ids(directory)
+    expired = set()
+    if keep:
+        expired.update(backup_ids[:-keep])
+    if max_age_days:
+        cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime(ID_FORMAT)
+        expired.update(backup_id for backup_id in backup_ids[:-1] if backup_id < cutoff)
+    for backup_id in expired:
+        os.remove(manifest_path(directory, backup_id))
+    
+    referenced = set()
+    for backup_id in list_ids(directory):
+        try:
+            referenced.update(load_manifest(directory, backup_id)['chunks'])
+        except (OSError, ValueError, KeyError):
+            return len(expired), 0
+    
+    removed = 0
+    for root, _, names in os.walk(chunks_dir(directory)):
+        for name in names:
+            if name not in referenced and not name.endswith('.tmp'):
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return len(expired), removed
+
+def is_due(directory, interval_hours) -> bool:
+    backup_ids = list_ids(directory)
+    if not backup_ids:
+        return True
+    last = datetime.strptime(backup_ids[-1], ID_FORMAT)
+    return datetime.utcnow() - last >= timedelta(hours=interval_hours)
+
+class BackupState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.last_error = None
+
+state = BackupState()
+
+def run_backup(app) -> dict:
+    vault_key = encryption_service.vault_key
+    if not vault_key:
+        raise BackupError('Vault is locked')
+    with state.lock:
+        with app.app_context():
+            db_path = db.engine.url.database
+        return create(app.config['BACKUP_DIR'], db_path, vault_key,
+                      keep=app.config.get('BACKUP_KEEP') or 0,
+                      max_age_days=app.config.get('BACKUP_MAX_AGE_DAYS') or 0)
+
+def verify_backup(app, backup_id) -> dict:
+    vault_key = encryption_service.vault_key
+    if not vault_key:
+        raise BackupError('Vault is locked')
+    return verify(app.config['BACKUP_DIR'], backup_id, vault_key)
+
+def run_scheduler(app):
+    interval_hours = app.config['BACKUP_INTERVAL_HOURS']
+    while not state.stopped.wait(CHECK_INTERVAL_SECONDS):
+        if not encryption_service.vault_key or not is_due(app.config['BACKUP_DIR'], interval_hours):
+            continue
+        try:
+            run_backup(app)
+            state.last_error = None
+        except Exception as e:
+            state.last_error = str(e)
+
+def status(app) -> dict:
+    return {
+        'interval_hours': app.config.get('BACKUP_INTERVAL_HOURS') or 0,
+        'scheduled': state.thread is not None and state.thread.is_alive(),
+        'last_error': state.last_error,
+        'backups': list_backups(app.config['BACKUP_DIR'])
+    }
+
+def start_scheduler(app):
+    if not app.config.get('BACKUP_INTERVAL_HOURS') or state.thread is not None:
+        return
+    state.thread = threading.Thread(target=run_scheduler, args=(app,), daemon=True)
+    state.thread.start()
+
+def read_key_material(db_path) -> dict:
+    connection = sqlite3.connect(db_path)
+    try:
+        row = connection.execute(f'SELECT {", ".join(KEY_COLUMNS)} FROM config LIMIT 1').fetchone()
+    finally:
+        connection.close()
+    if row is None:
+        raise BackupError('Vault has not been set up')
+    return encode_key_material(dict(zip(KEY_COLUMNS, row)))
+
+def unwrap_vault_keys(material: dict, master_password: str) -> list:
+    salt = base64.b64decode(material['salt'])
+    if material['kdf_version'] == KDF_ARGON2ID:
+        params = json.loads(material['kdf_params'])
+        _, wrapping_key = encryption_service.derive_unlock_keys(master_password, salt, params)
+    else:
+        wrapping_key = encryption_service.derive_master_key(master_password, salt)
+    
+    vault_keys = []
+    for name in ('pending_vault_key', 'encrypted_vault_key'):
+        if not material.get(name):
+            continue
+        try:
+            vault_keys.append(encryption_service.decrypt_vault_key(base64.b64decode(material[name]), wrapping_key))
+        except InvalidToken:
+            raise BackupError('Invalid master password')
+    return vault_keys
+
+def backup_vault_key(manifest: dict, master_password: str) -> bytes:
+    for vault_key in unwrap_vault_keys(manifest['key_material'], master_password):
+        if BackupKeys(vault_key).key_id == manifest['key_id']:
+            return vault_key
+    raise CorruptBackupError('Backup was made with a different vault key')
+
+def main():
+    parser = argparse.ArgumentParser(description='Create, verify and restore encrypted incremental backups')
+    parser.add_argument('--dir', default=Config.BACKUP_DIR)
+    parser.add_argument('--db', default=Config.DB_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create')
+    commands.add_parser('list')
+    verify_parser = commands.add_parser('verify')
+    verify_parser.add_argument('backup_id', nargs='?')
+    restore_parser = commands.add_parser('restore')
+    restore_parser.add_argument('backup_id', nargs='?')
+    restore_parser.add_argument('--output', required=True)
+    restore_parser.add_argument('--force', action='store_true')
+    prune_parser = commands.add_parser('prune')
+    prune_parser.add_argument('--keep', type=int, default=Config.BACKUP_KEEP)
+    prune_parser.add_argument('--max-age-days', type=int, default=Config.BACKUP_MAX_AGE_DAYS)
+    args = parser.parse_args()
+    
+    try:
+        if args.command == 'list':
+            for backup in list_backups(args.dir):
+                print(json.dumps(backup, ensure_ascii=False))
+        elif args.command == 'prune':
+            expired, removed = prune(args.dir, args.keep, args.max_age_days)
+            print(f'Removed {expired} backups and {removed} unreferenced chunks')
+        elif args.command == 'create':
+            material = read_key_material(args.db)
+            vault_keys = unwrap_vault_keys(material, getpass.getpass('Master password: '))
+            manifest = create(args.dir, args.db, vault_keys[0], Config.BACKUP_KEEP, Config.BACKUP_MAX_AGE_DAYS)
+            print(f"{manifest['id']}: {manifest['size']} bytes in {len(manifest['chunks'])} chunks, "
+                  f"{manifest['stored_bytes']} bytes written")
+        else:
+            backup_ids = list_ids(args.dir)
+            backup_id = args.backup_id or (backup_ids[-1] if backup_ids else None)
+            if backup_id is None:
+                raise BackupError(f'No backups in {args.dir}')
+            manifest = load_manifest(args.dir, backup_id)
+            vault_key = backup_vault_key(manifest, getpass.getpass('Master password: '))
+            if args.command == 'verify':
+                verify(args.dir, backup_id, vault_key)
+                print(f'{backup_id}: OK')
+            else:
+                restore(args.dir, backup_id, vault_key, args.output, force=args.force)
+                print(f'{backup_id}: restored to {args.output}')
+    except (BackupError, CorruptBackupError, OSError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
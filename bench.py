@@ -0,0 +1,280 @@
+from config import Config
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BENCH_PASSWORD = 'benchmark-master-password'
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_ITERATIONS = 20
+IMPORT_BATCH_ENTRIES = 100
+PAGE_SIZE = 50
+
+WORDS = [
+    'alpha', 'bank', 'cloud', 'delta', 'email', 'forum', 'github', 'hosting', 'invoice', 'jira',
+    'kernel', 'ledger', 'mail', 'network', 'office', 'portal', 'quota', 'router', 'shop', 'travel',
+    'umbrella', 'vpn', 'wallet', 'xbox', 'youtube', 'zoom', '银行', '邮箱', '工作', '社交'
+]
+
+class VaultSpec:
+    def __init__(self, entries, categories=8, tags=40, tags_per_entry=3, note_bytes=256, seed=1):
+        self.entries = entries
+        self.categories = categories
+        self.tags = tags
+        self.tags_per_entry = tags_per_entry
+        self.note_bytes = note_bytes
+        self.seed = seed
+    
+    def to_dict(self):
+        return dict(vars(self))
+
+def synthetic_text(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word.encode('utf-8')) + 1
+    return ' '.join(words)
+
+def synthetic_entry(rng, spec, index, category_ids, tag_names):
+    word = rng.choice(WORDS)
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    return {
+        'type': 'entry',
+        'title': f'{word.title()} {index}',
+        'username': f'user{index}@{word}.example',
+        'password': ''.join(rng.choice(alphabet) for _ in range(rng.randint(12, 24))),
+        'url': f'https://{word}{index % 97}.example.com/login',
+        'notes': synthetic_text(rng, spec.note_bytes) if spec.note_bytes else '',
+        'category_id': rng.choice(category_ids) if category_ids else None,
+        'is_favorite': rng.random() < 0.1,
+        'tags': rng.sample(tag_names, min(spec.tags_per_entry, len(tag_names)))
+    }
+
+def synthetic_records(spec, category_ids, start=0, count=None):
+    rng = random.Random(f'{spec.seed}:{start}')
+    tag_names = [f'tag-{i}' for i in range(spec.tags)]
+    
+    if start == 0:
+        for i in range(spec.categories):
+            yield {'type': 'category', 'name': f'分类 {i}', 'icon': 'folder', 'color': '#6366f1'}
+        for name in tag_names:
+            yield {'type': 'tag', 'name': name}
+    
+    count = spec.entries if count is None else count
+    for index in range(start, start + count):
+        yield synthetic_entry(rng, spec, index, category_ids, tag_names)
+
+def process_peak_rss_kib():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) // 1024
+    return None
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(durations, total_seconds, peak_before, peak_after):
+    ordered = sorted(durations)
+    return {
+        'iterations': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'throughput_rps': round(len(ordered) / total_seconds, 3) if total_seconds else None,
+        # The process peak is a lifetime high-water mark, so only its growth is attributable here
+        'peak_rss_growth_kib': peak_after - peak_before if peak_after is not None else None
+    }
+
+def timed_request(client, method, path, expected, **kwargs):
+    start = time.perf_counter()
+    response = client.open(path, method=method, **kwargs)
+    response.get_data()
+    elapsed = time.perf_counter() - start
+    if response.status_code not in expected:
+        raise RuntimeError(f'{method} {path} returned {response.status_code}: '
+                           f'{response.get_data(as_text=True)[:200]}')
+    return elapsed
+
+def bench_cases(spec, state):
+    search_rng = random.Random(spec.seed)
+    
+    def search_request():
+        term = search_rng.choice(WORDS[:26])
+        return 'GET', f'/api/search?q={term}&limit={PAGE_SIZE}', {}
+    
+    def import_request():
+        start = spec.entries + state['imported']
+        state['imported'] += IMPORT_BATCH_ENTRIES
+        entries = [dict(record, category_id=None) for record in
+                   synthetic_records(spec, [], start=start, count=IMPORT_BATCH_ENTRIES)]
+        return 'POST', '/api/import', {'json': {'entries': entries}}
+    
+    return [
+        ('get_entries', 1, lambda: ('GET', '/api/entries', {})),
+        ('get_entries_page', 1, lambda: ('GET', f'/api/entries?limit={PAGE_SIZE}', {})),
+        ('search_entries', 1, search_request),
+        ('export_data', 4, lambda: ('GET', '/api/export', {})),
+        ('export_ndjson', 4, lambda: ('GET', '/api/export?format=ndjson', {})),
+        ('import_data', 1, import_request),
+        ('verify_and_unlock', 4, lambda: ('POST', '/api/login', {'json': {'master_password': BENCH_PASSWORD}})),
+    ]
+
+def seed_vault(app, spec):
+    from models import db, Category
+    import import_jobs
+    
+    with app.app_context():
+        import_jobs.import_records(
+            record for record in synthetic_records(spec, []) if record['type'] != 'entry')
+        category_ids = [category_id for (category_id,) in db.session.query(Category.id)]
+        import_jobs.import_records(
+            record for record in synthetic_records(spec, category_ids) if record['type'] == 'entry')
+
+def run_size(spec, iterations, only=None):
+    from app import create_app
+    
+    workdir = tempfile.mkdtemp(prefix='pm-bench-')
+    Config.DB_PATH = os.path.join(workdir, 'bench.db')
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{Config.DB_PATH}'
+    Config.KDF_PARAMS_PATH = os.path.join(workdir, 'kdf_params.json')
+    Config.BREACH_CORPUS_PATH = os.path.join(workdir, 'breach_corpus.bin')
+    Config.BACKUP_DIR = os.path.join(workdir, 'backups')
+    Config.BACKUP_INTERVAL_HOURS = 0
+    
+    try:
+        app = create_app()
+        client = app.test_client()
+        timed_request(client, 'POST', '/api/setup', (200,), json={'master_password': BENCH_PASSWORD})
+        
+        start = time.perf_counter()
+        seed_vault(app, spec)
+        seed_seconds = time.perf_counter() - start
+        
+        state = {'imported': 0}
+        endpoints = {}
+        for name, divisor, make_request in bench_cases(spec, state):
+            if only and name not in only:
+                continue
+            count = max(iterations // divisor, 1)
+            method, path, kwargs = make_request()
+            timed_request(client, method, path, (200,), **kwargs)
+            
+            peak_before = process_peak_rss_kib()
+            durations = []
+            started = time.perf_counter()
+            for _ in range(count):
+                method, path, kwargs = make_request()
+                durations.append(timed_request(client, method, path, (200,), **kwargs))
+            total = time.perf_counter() - started
+            endpoints[name] = summarize(durations, total, peak_before, process_peak_rss_kib())
+            print(f"  {name:<18} p50 {endpoints[name]['p50_ms']:>10.2f} ms  "
+                  f"p95 {endpoints[name]['p95_ms']:>10.2f} ms  "
+                  f"{endpoints[name]['throughput_rps']:>8.2f} req/s")
+        
+        client.post('/api/lock')
+        with app.app_context():
+            from models import db
+            db.session.remove()
+            db.engine.dispose()
+        
+        return {
+            'vault': spec.to_dict(),
+            'seed_seconds': round(seed_seconds, 3),
+            'database_bytes': os.path.getsize(Config.DB_PATH),
+            'process_peak_rss_kib': process_peak_rss_kib(),
+            'endpoints': endpoints
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(previous, current):
+    print()
+    print(f"Compared with {previous.get('commit') or 'baseline'} ({previous.get('timestamp')}):")
+    for size, result in current['results'].items():
+        old_endpoints = previous.get('results', {}).get(size, {}).get('endpoints', {})
+        for name, stats in result['endpoints'].items():
+            old = old_endpoints.get(name)
+            if not old:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p95_ms'):
+                delta = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0
+                changes.append(f'{key[:3]} {delta:+6.1f}%')
+            print(f"  {size:>7} {name:<18} {'  '.join(changes)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths against synthetic vaults')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma-separated vault sizes (entries)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--tags', type=int, default=40)
+    parser.add_argument('--tags-per-entry', type=int, default=3)
+    parser.add_argument('--note-bytes', type=int, default=256)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', help='comma-separated endpoint names to run')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    args = parser.parse_args()
+    
+    only = set(args.only.split(',')) if args.only else None
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'iterations': args.iterations,
+        'results': {}
+    }
+    
+    for size in (int(size) for size in args.sizes.split(',')):
+        spec = VaultSpec(size, args.categories, args.tags, args.tags_per_entry, args.note_bytes, args.seed)
+        print(f'Vault with {size} entries:')
+        report['results'][str(size)] = run_size(spec, args.iterations, only)
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f'Results written to {args.output}')
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
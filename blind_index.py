@@ -0,0 +1,93 @@
+from flask import current_app
+from models import db, Entry, NoteToken, BlindIndexState
+from encryption import encryption_service, entry_aad
+import re
+
+REBUILD_BATCH_SIZE = 500
+MAX_TOKENS_PER_NOTE = 512
+
+WORD_PATTERN = re.compile(r'\w+')
+CJK_PATTERN = re.compile(r'[぀-ヿ㐀-䶿一-鿿가-힯]')
+
+def enabled() -> bool:
+    return current_app.config.get('NOTES_BLIND_INDEX', False)
+
+def normalize_words(text: str) -> list:
+    words = {}
+    for word in WORD_PATTERN.findall((text or '').lower()):
+        if CJK_PATTERN.search(word):
+            if len(word) == 1:
+                words[word] = None
+            for i in range(len(word) - 1):
+                words[word[i:i + 2]] = None
+        elif len(word) >= 2:
+            words[word] = None
+    return list(words)
+
+def note_tokens(text: str) -> list:
+    words = normalize_words(text)[:MAX_TOKENS_PER_NOTE]
+    return sorted({encryption_service.blind_token(word) for word in words})
+
+def index_notes(entry, notes: str):
+    if not enabled():
+        return
+    entry.note_tokens = [NoteToken(token=token) for token in note_tokens(notes)]
+
+def rebuild():
+    NoteToken.query.delete()
+    
+    last_id = 0
+    while True:
+        batch = (db.session.query(Entry.id, Entry.notes)
+                 .filter(Entry.id > last_id)
+                 .order_by(Entry.id)
+                 .limit(REBUILD_BATCH_SIZE)
+                 .all())
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        
+        notes = encryption_service.decrypt_many([row[1] for row in batch], strict=False,
+                                                associated_data=[entry_aad(row[0], 'notes') for row in batch])
+        rows = []
+        for (entry_id, _), text in zip(batch, notes):
+            if text:
+                rows.extend({'entry_id': entry_id, 'token': token} for token in note_tokens(text))
+        if rows:
+            db.session.execute(NoteToken.__table__.insert(), rows)
+    
+    state = BlindIndexState.query.first()
+    if not state:
+        state = BlindIndexState(key_id='')
+        db.session.add(state)
+    state.key_id = encryption_service.blind_key_id()
+    db.session.commit()
+
+def ensure_current():
+    state = BlindIndexState.query.first()
+    
+    if not enabled():
+        if state or db.session.query(NoteToken.id).first():
+            NoteToken.query.delete()
+            BlindIndexState.query.delete()
+            db.session.commit()
+        return
+    
+    if not state or state.key_id != encryption_service.blind_key_id():
+        rebuild()
+
+def search(query: str) -> list:
+    if not enabled():
+        return []
+    
+    tokens = {encryption_service.blind_token(word) for word in normalize_words(query)}
+    if not tokens:
+        return []
+    
+    rows = (db.session.query(NoteToken.entry_id)
+            .filter(NoteToken.token.in_(tokens))
+            .group_by(NoteToken.entry_id)
+            .having(db.func.count(db.distinct(NoteToken.token)) == len(tokens))
+            .order_by(NoteToken.entry_id)
+            .all())
+    return [entry_id for (entry_id,) in rows]
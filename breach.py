@@ -0,0 +1,251 @@
+from config import Config
+import argparse
+import getpass
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+MAGIC = b'PMBREACH'
+BLOOM_MAGIC = b'PMBLOOM1'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sBxxxxxxxQ')
+BLOOM_HEADER = struct.Struct('<8sQQ')
+RECORD_SIZE = 20
+SORT_CHUNK_RECORDS = 4_000_000
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+
+def bloom_path(path):
+    return path + '.bloom'
+
+def password_digest(password: str) -> bytes:
+    return hashlib.sha1(password.encode('utf-8')).digest()
+
+def bloom_positions(digest, bits, hashes):
+    first = int.from_bytes(digest[:8], 'little')
+    second = int.from_bytes(digest[8:16], 'little') | 1
+    return [(first + i * second) % bits for i in range(hashes)]
+
+def parse_corpus_line(line):
+    value = line.split(b':', 1)[0].strip()
+    if len(value) != RECORD_SIZE * 2:
+        return None
+    try:
+        return bytes.fromhex(value.decode('ascii'))
+    except ValueError:
+        return None
+
+def write_run(records, directory):
+    records.sort()
+    handle = tempfile.NamedTemporaryFile(dir=directory, suffix='.run', delete=False)
+    with handle:
+        handle.write(b''.join(records))
+    return handle.name
+
+def iter_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            record = f.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                return
+            yield record
+
+def build_corpus(source_path, output_path, chunk_records=SORT_CHUNK_RECORDS):
+    directory = os.path.dirname(os.path.abspath(output_path))
+    runs = []
+    records = []
+    try:
+        with open(source_path, 'rb') as source:
+            for line in source:
+                digest = parse_corpus_line(line)
+                if digest is None:
+                    continue
+                records.append(digest)
+                if len(records) >= chunk_records:
+                    runs.append(write_run(records, directory))
+                    records = []
+        if records:
+            runs.append(write_run(records, directory))
+            records = []
+        
+        count = 0
+        partial_path = output_path + '.partial'
+        with open(partial_path, 'wb') as output:
+            output.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+            previous = None
+            for record in heapq.merge(*(iter_run(run) for run in runs)):
+                if record != previous:
+                    output.write(record)
+                    previous = record
+                    count += 1
+            output.seek(0)
+            output.write(HEADER.pack(MAGIC, FORMAT_VERSION, count))
+        os.replace(partial_path, output_path)
+        return count
+    finally:
+        for run in runs:
+            os.remove(run)
+
+def build_bloom(corpus_path, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+    with BreachCorpus(corpus_path, use_bloom=False) as corpus:
+        count = max(corpus.count, 1)
+        bits = max(int(-count * math.log(false_positive_rate) / math.log(2) ** 2), 64)
+        hashes = max(int(round(bits / count * math.log(2))), 1)
+        array = bytearray((bits + 7) // 8)
+        for index in range(corpus.count):
+            for position in bloom_positions(corpus.record(index), bits, hashes):
+                array[position >> 3] |= 1 << (position & 7)
+    
+    partial_path = bloom_path(corpus_path) + '.partial'
+    with open(partial_path, 'wb') as f:
+        f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, bits, hashes))
+        f.write(array)
+    os.replace(partial_path, bloom_path(corpus_path))
+    return bits, hashes
+
+class BreachCorpus:
+    def __init__(self, path, use_bloom=True):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.bloom_file = None
+        self.bloom = None
+        try:
+            self.open(path, use_bloom)
+        except struct.error:
+            self.close()
+            raise ValueError(f'{path} is truncated')
+        except Exception:
+            self.close()
+            raise
+    
+    def open(self, path, use_bloom):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a breach corpus file')
+        if HEADER.size + self.count * RECORD_SIZE > len(self.map):
+            raise ValueError(f'{path} is truncated')
+        
+        if use_bloom and os.path.exists(bloom_path(path)):
+            self.bloom_file = open(bloom_path(path), 'rb')
+            self.bloom = mmap.mmap(self.bloom_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.bloom_bits, self.bloom_hashes = BLOOM_HEADER.unpack_from(self.bloom, 0)
+            if magic != BLOOM_MAGIC:
+                raise ValueError(f'{bloom_path(path)} is not a Bloom filter file')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def record(self, index):
+        offset = HEADER.size + index * RECORD_SIZE
+        return self.map[offset:offset + RECORD_SIZE]
+    
+    def maybe_contains(self, digest):
+        if self.bloom is None:
+            return True
+        for position in bloom_positions(digest, self.bloom_bits, self.bloom_hashes):
+            if not self.bloom[BLOOM_HEADER.size + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+    
+    def contains_digest(self, digest):
+        if not self.maybe_contains(digest):
+            return False
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record = self.record(middle)
+            if record < digest:
+                low = middle + 1
+            elif record > digest:
+                high = middle
+            else:
+                return True
+        return False
+    
+    def contains(self, password: str) -> bool:
+        return self.contains_digest(password_digest(password))
+    
+    def close(self):
+        for handle in (self.bloom, self.bloom_file, self.map, self.file):
+            if handle is not None:
+                handle.close()
+        self.bloom = self.bloom_file = None
+
+class BreachChecker:
+    def __init__(self):
+        self.corpus = None
+        self.signature = None
+        self.lock = threading.Lock()
+    
+    def current(self):
+        path = Config.BREACH_CORPUS_PATH
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        bloom_mtime = os.path.getmtime(bloom_path(path)) if os.path.exists(bloom_path(path)) else None
+        signature = (path, stat.st_mtime, stat.st_size, bloom_mtime)
+        
+        with self.lock:
+            if signature != self.signature:
+                self.signature = signature
+                if self.corpus is not None:
+                    self.corpus.close()
+                try:
+                    self.corpus = BreachCorpus(path)
+                except (OSError, ValueError):
+                    self.corpus = None
+            return self.corpus
+    
+    def available(self) -> bool:
+        return self.current() is not None
+    
+    def check(self, password: str):
+        corpus = self.current()
+        if corpus is None or not password:
+            return None
+        try:
+            return corpus.contains(password)
+        except ValueError:
+            return None
+
+breach_checker = BreachChecker()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the offline breached-password corpus')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build = subparsers.add_parser('build', help='convert a SHA-1 hash list (HASH or HASH:COUNT per line)')
+    build.add_argument('source')
+    build.add_argument('--output', default=Config.BREACH_CORPUS_PATH)
+    build.add_argument('--bloom', action='store_true', help='also write a Bloom filter')
+    build.add_argument('--false-positive-rate', type=float, default=DEFAULT_FALSE_POSITIVE_RATE)
+    
+    check = subparsers.add_parser('check', help='check a password (prompted, or read from stdin) against the corpus')
+    check.add_argument('--corpus', default=Config.BREACH_CORPUS_PATH)
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        count = build_corpus(args.source, args.output)
+        print(f'Wrote {count} hashes to {args.output}')
+        if args.bloom:
+            bits, hashes = build_bloom(args.output, args.false_positive_rate)
+            print(f'Wrote Bloom filter ({bits // 8 // 1024} KiB, {hashes} hashes) to {bloom_path(args.output)}')
+    else:
+        password = getpass.getpass('Password: ') if sys.stdin.isatty() else sys.stdin.readline().rstrip('\r\n')
+        with BreachCorpus(args.corpus) as corpus:
+            print('breached' if corpus.contains(password) else 'not found')
+
+if __name__ == '__main__':
+    main()
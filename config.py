@@ -15,6 +15,32 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DB_PATH}'
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    KDF_PARAMS_PATH = os.path.join(get_base_path(), 'kdf_params.json')
+    LOGIN_CONCURRENCY = 2
+    LOGIN_QUEUE_TIMEOUT = 5
+    SERVE_HOST = os.environ.get('SERVE_HOST', '127.0.0.1')
+    SERVE_PORT = int(os.environ.get('SERVE_PORT', 5000))
+    SERVE_THREADS = int(os.environ.get('SERVE_THREADS', 8))
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    }
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 0))
+    ASSETS_MINIFY = os.environ.get('ASSETS_MINIFY', '1') == '1'
+    BREACH_CORPUS_PATH = os.environ.get('BREACH_CORPUS_PATH') or os.path.join(get_base_path(), 'breach_corpus.bin')
+    ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_BYTES', 100 * 1024 * 1024))
+    HISTORY_MAX_REVISIONS = int(os.environ.get('HISTORY_MAX_REVISIONS', 50))
+    HISTORY_MAX_AGE_DAYS = int(os.environ.get('HISTORY_MAX_AGE_DAYS', 0))
+    BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(get_base_path(), 'backups')
+    BACKUP_INTERVAL_HOURS = int(os.environ.get('BACKUP_INTERVAL_HOURS', 24))
+    BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', 14))
+    BACKUP_MAX_AGE_DAYS = int(os.environ.get('BACKUP_MAX_AGE_DAYS', 0))
+    NOTES_BLIND_INDEX = os.environ.get('NOTES_BLIND_INDEX', '0') == '1'
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     SESSION_COOKIE_SECURE = False
     SESSION_COOKIE_HTTPONLY = True
@@ -0,0 +1,75 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, Entry, Tombstone, SyncState
+from datetime import datetime, timedelta
+import base64
+import hashlib
+import json
+
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+def next_change_seq(connection=None):
+    connection = connection or db.session.connection()
+    table = SyncState.__table__
+    connection.execute(table.update().where(table.c.id == 1).values(change_seq=table.c.change_seq + 1))
+    return connection.execute(db.select(table.c.change_seq).where(table.c.id == 1)).scalar()
+
+@event.listens_for(Session, 'before_flush')
+def stamp_changed_entries(session, flush_context, instances):
+    changed = [obj for obj in session.new if isinstance(obj, Entry)]
+    changed.extend(obj for obj in session.dirty if isinstance(obj, Entry) and session.is_modified(obj))
+    if changed:
+        seq = next_change_seq(session.connection())
+        for entry in changed:
+            entry.change_seq = seq
+
+def record_deletions(entry_ids):
+    now = datetime.utcnow()
+    if entry_ids:
+        seq = next_change_seq()
+        db.session.execute(Tombstone.__table__.insert(),
+                           [{'entry_id': entry_id, 'deleted_at': now, 'change_seq': seq}
+                            for entry_id in entry_ids])
+    
+    expired = Tombstone.query.filter(Tombstone.deleted_at < now - TOMBSTONE_RETENTION)
+    pruned_seq = expired.with_entities(db.func.max(Tombstone.change_seq)).scalar()
+    if pruned_seq is not None:
+        expired.delete()
+        db.session.execute(SyncState.__table__.update()
+                           .where(SyncState.__table__.c.id == 1)
+                           .where(SyncState.__table__.c.pruned_seq < pruned_seq)
+                           .values(pruned_seq=pruned_seq))
+
+def vault_state():
+    return db.session.query(SyncState.change_seq, SyncState.pruned_seq).filter(SyncState.id == 1).one()
+
+def sync_token(state):
+    change_seq, _ = state
+    return base64.urlsafe_b64encode(json.dumps([change_seq]).encode()).decode()
+
+def parse_sync_token(token):
+    try:
+        (change_seq,) = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        return None
+    return change_seq if isinstance(change_seq, int) else None
+
+def vault_etag(state, variant=''):
+    change_seq, _ = state
+    raw = json.dumps([change_seq, variant])
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def changes_since(since, state):
+    change_seq, pruned_seq = state
+    if since is None or not pruned_seq <= since <= change_seq:
+        return None, None
+    
+    changed = (Entry.query
+               .filter(Entry.change_seq > since)
+               .order_by(Entry.change_seq.desc(), Entry.id.desc())
+               .all())
+    deleted = [entry_id for (entry_id,) in
+               db.session.query(Tombstone.entry_id)
+               .filter(Tombstone.change_seq > since)
+               .distinct()]
+    return changed, deleted
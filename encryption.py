@@ -1,15 +1,78 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from argon2 import PasswordHasher
+from argon2.low_level import hash_secret_raw, Type
+from concurrent.futures import ThreadPoolExecutor
 import os
 import base64
+import hashlib
+import hmac
+import threading
+import metrics
+
+KDF_LEGACY = 1
+KDF_ARGON2ID = 2
+
+DEFAULT_KDF_PARAMS = {
+    'time_cost': 3,
+    'memory_cost': 65536,
+    'parallelism': 4
+}
+
+PARALLEL_THRESHOLD = 256
+CHUNK_SIZE = 128
+
+FORMAT_AES_GCM = 1
+NONCE_SIZE = 12
+
+def entry_aad(entry_id, field: str) -> bytes:
+    return f'entry:{entry_id}:{field}'.encode()
+
+def attachment_aad(attachment_id, field: str) -> bytes:
+    return f'attachment:{attachment_id}:{field}'.encode()
+
+def is_legacy_token(value: bytes) -> bool:
+    return bool(value) and value[0] != FORMAT_AES_GCM
+
+class KeyRing:
+    def __init__(self, vault_key: bytes, previous_key: bytes = None):
+        keys = [vault_key] + ([previous_key] if previous_key else [])
+        self.fernet = MultiFernet([Fernet(key) for key in keys])
+        self.aeads = [AESGCM(hmac.new(key, b'aead-aes-256-gcm', hashlib.sha256).digest()) for key in keys]
+    
+    def seal(self, plaintext: bytes, associated_data: bytes = None) -> bytes:
+        header = bytes([FORMAT_AES_GCM])
+        nonce = os.urandom(NONCE_SIZE)
+        return header + nonce + self.aeads[0].encrypt(nonce, plaintext, header + (associated_data or b''))
+    
+    def open(self, value: bytes, associated_data: bytes = None) -> bytes:
+        if is_legacy_token(value):
+            return self.fernet.decrypt(value)
+        header = value[:1]
+        nonce = value[1:1 + NONCE_SIZE]
+        for aead in self.aeads:
+            try:
+                return aead.decrypt(nonce, value[1 + NONCE_SIZE:], header + (associated_data or b''))
+            except InvalidTag:
+                continue
+        raise InvalidTag()
 
 class EncryptionService:
     def __init__(self):
         self.vault_key = None
+        self.previous_vault_key = None
         self.ph = PasswordHasher()
+        self._keyring = None
+        self._blind_key = None
+        self._fingerprint_key = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._key_lock = threading.Lock()
     
+    @metrics.timed('pbkdf2', phase='kdf')
     def derive_master_key(self, master_password: str, salt: bytes) -> bytes:
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
@@ -19,9 +82,29 @@ class EncryptionService:
         )
         return base64.urlsafe_b64encode(kdf.derive(master_password.encode()))
     
+    @metrics.timed('argon2id', phase='kdf')
+    def derive_unlock_keys(self, master_password: str, salt: bytes, params: dict):
+        raw = hash_secret_raw(
+            secret=master_password.encode(),
+            salt=salt,
+            time_cost=params['time_cost'],
+            memory_cost=params['memory_cost'],
+            parallelism=params['parallelism'],
+            hash_len=64,
+            type=Type.ID
+        )
+        verifier = hashlib.sha256(raw[:32]).hexdigest()
+        wrapping_key = base64.urlsafe_b64encode(raw[32:])
+        return verifier, wrapping_key
+    
+    def check_verifier(self, expected: str, actual: str) -> bool:
+        return hmac.compare_digest(expected.encode(), actual.encode())
+    
+    @metrics.timed('argon2_hash', phase='kdf')
     def hash_master_password(self, master_password: str) -> str:
         return self.ph.hash(master_password)
     
+    @metrics.timed('argon2_verify', phase='kdf')
     def verify_master_password(self, hash: str, master_password: str) -> bool:
         try:
             self.ph.verify(hash, master_password)
@@ -40,26 +123,134 @@ class EncryptionService:
         f = Fernet(master_key)
         return f.decrypt(encrypted_vault_key)
     
-    def set_vault_key(self, vault_key: bytes):
-        self.vault_key = vault_key
+    def set_vault_key(self, vault_key: bytes, previous_key: bytes = None):
+        keyring = KeyRing(vault_key, previous_key)
+        blind_source = previous_key or vault_key
+        blind_key = hmac.new(blind_source, b'notes-blind-index', hashlib.sha256).digest()
+        fingerprint_key = hmac.new(blind_source, b'password-fingerprint', hashlib.sha256).digest()
+        
+        with self._key_lock:
+            self.vault_key = vault_key
+            self.previous_vault_key = previous_key
+            self._keyring = keyring
+            self._blind_key = blind_key
+            self._fingerprint_key = fingerprint_key
     
-    def encrypt_data(self, data: str) -> bytes:
-        if not self.vault_key:
+    def rotation_cipher(self) -> KeyRing:
+        with self._key_lock:
+            vault_key, previous_key = self.vault_key, self.previous_vault_key
+        if not vault_key or not previous_key:
+            raise ValueError("No vault key rotation in progress")
+        return KeyRing(vault_key, previous_key)
+    
+    def _cipher(self) -> KeyRing:
+        keyring = self._keyring
+        if keyring is None:
             raise ValueError("Vault key not set")
+        return keyring
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count() or 4,
+                    thread_name_prefix='crypto'
+                )
+            return self._executor
+    
+    def _map_chunked(self, func, values: list) -> list:
+        if len(values) < PARALLEL_THRESHOLD:
+            return func(values)
+        chunks = [values[i:i + CHUNK_SIZE] for i in range(0, len(values), CHUNK_SIZE)]
+        result = []
+        for chunk_result in self._get_executor().map(func, chunks):
+            result.extend(chunk_result)
+        return result
+    
+    @metrics.timed('encrypt')
+    def encrypt_data(self, data: str, associated_data: bytes = None) -> bytes:
+        keyring = self._cipher()
         if not data:
             return b''
-        f = Fernet(self.vault_key)
-        return f.encrypt(data.encode())
+        return keyring.seal(data.encode(), associated_data)
     
-    def decrypt_data(self, encrypted_data: bytes) -> str:
-        if not self.vault_key:
-            raise ValueError("Vault key not set")
+    @metrics.timed('decrypt')
+    def decrypt_data(self, encrypted_data: bytes, associated_data: bytes = None) -> str:
+        keyring = self._cipher()
         if not encrypted_data:
             return ''
-        f = Fernet(self.vault_key)
-        return f.decrypt(encrypted_data).decode()
+        return keyring.open(encrypted_data, associated_data).decode()
+    
+    @metrics.timed('encrypt_bytes')
+    def encrypt_bytes(self, data: bytes, associated_data: bytes = None) -> bytes:
+        return self._cipher().seal(data, associated_data)
+    
+    @metrics.timed('decrypt_bytes')
+    def decrypt_bytes(self, token: bytes, associated_data: bytes = None) -> bytes:
+        return self._cipher().open(token, associated_data)
+    
+    def reencrypt(self, value: bytes, associated_data: bytes = None, keyring: KeyRing = None) -> bytes:
+        keyring = keyring or self._cipher()
+        return keyring.seal(keyring.open(value, associated_data), associated_data)
+    
+    @metrics.timed('encrypt_many')
+    def encrypt_many(self, values: list, associated_data: list = None) -> list:
+        keyring = self._cipher()
+        values = list(values)
+        pairs = list(zip(values, associated_data if associated_data is not None else [None] * len(values)))
+        
+        def encrypt_chunk(chunk):
+            return [keyring.seal(value.encode(), aad) if value else b'' for value, aad in chunk]
+        
+        return self._map_chunked(encrypt_chunk, pairs)
+    
+    @metrics.timed('decrypt_many')
+    def decrypt_many(self, values: list, strict: bool = True, associated_data: list = None) -> list:
+        keyring = self._cipher()
+        values = list(values)
+        pairs = list(zip(values, associated_data if associated_data is not None else [None] * len(values)))
+        
+        def decrypt_one(value, aad):
+            if not value:
+                return ''
+            if strict:
+                return keyring.open(value, aad).decode()
+            try:
+                return keyring.open(value, aad).decode()
+            except Exception:
+                return None
+        
+        def decrypt_chunk(chunk):
+            return [decrypt_one(value, aad) for value, aad in chunk]
+        
+        return self._map_chunked(decrypt_chunk, pairs)
+    
+    def blind_token(self, word: str) -> str:
+        blind_key = self._blind_key
+        if blind_key is None:
+            raise ValueError("Vault key not set")
+        return hmac.new(blind_key, word.encode(), hashlib.sha256).hexdigest()[:32]
+    
+    def blind_key_id(self) -> str:
+        return self.blind_token('\x00key-id')
+    
+    def password_fingerprint(self, password: str) -> str:
+        fingerprint_key = self._fingerprint_key
+        if fingerprint_key is None:
+            raise ValueError("Vault key not set")
+        if not password:
+            return None
+        return hmac.new(fingerprint_key, password.encode(), hashlib.sha256).hexdigest()[:32]
+    
+    def fingerprint_key_id(self) -> str:
+        return self.password_fingerprint('\x00key-id')
     
     def clear_vault_key(self):
-        self.vault_key = None
+        with self._key_lock:
+            self.vault_key = None
+            self.previous_vault_key = None
+            self._keyring = None
+            self._blind_key = None
+            self._fingerprint_key = None
 
 encryption_service = EncryptionService()
@@ -0,0 +1,99 @@
+from models import db, Entry, Category, Tag, entry_tags
+from encryption import encryption_service, entry_aad
+import json
+import lzma
+import zlib
+
+EXPORT_BATCH_SIZE = 500
+FLUSH_SIZE = 64 * 1024
+
+COMPRESSORS = {
+    'gzip': ('application/gzip', '.gz'),
+    'lzma': ('application/x-xz', '.xz')
+}
+
+def make_compressor(compression):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == 'lzma':
+        return lzma.LZMACompressor(preset=3)
+    raise ValueError('Unsupported compression')
+
+def iter_entry_batches(batch_size=EXPORT_BATCH_SIZE):
+    last_id = 0
+    while True:
+        batch = (db.session.query(
+                    Entry.id, Entry.title, Entry.username, Entry.password, Entry.url,
+                    Entry.notes, Entry.category_id, Entry.is_favorite)
+                 .filter(Entry.id > last_id)
+                 .order_by(Entry.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            return
+        last_id = batch[-1].id
+        
+        tag_names = {}
+        tag_rows = (db.session.query(entry_tags.c.entry_id, Tag.name)
+                    .join(Tag, Tag.id == entry_tags.c.tag_id)
+                    .filter(entry_tags.c.entry_id.in_([row.id for row in batch])))
+        for entry_id, name in tag_rows:
+            tag_names.setdefault(entry_id, []).append(name)
+        
+        yield batch, tag_names
+
+def iter_ndjson_records():
+    for cat in Category.query.all():
+        yield {'type': 'category', 'name': cat.name, 'icon': cat.icon, 'color': cat.color}
+    
+    for tag in Tag.query.all():
+        yield {'type': 'tag', 'name': tag.name}
+    
+    for batch, tag_names in iter_entry_batches():
+        passwords = encryption_service.decrypt_many(
+            [row.password for row in batch], strict=False,
+            associated_data=[entry_aad(row.id, 'password') for row in batch])
+        notes = encryption_service.decrypt_many(
+            [row.notes for row in batch], strict=False,
+            associated_data=[entry_aad(row.id, 'notes') for row in batch])
+        
+        for row, password, note in zip(batch, passwords, notes):
+            if password is None or note is None:
+                continue
+            yield {
+                'type': 'entry',
+                'title': row.title,
+                'username': row.username,
+                'password': password,
+                'url': row.url,
+                'notes': note,
+                'category_id': row.category_id,
+                'is_favorite': row.is_favorite,
+                'tags': tag_names.get(row.id, [])
+            }
+
+def iter_ndjson_chunks():
+    buffer = []
+    size = 0
+    for record in iter_ndjson_records():
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+def iter_export_stream(compression=None):
+    if not compression:
+        yield from iter_ndjson_chunks()
+        return
+    
+    compressor = make_compressor(compression)
+    for chunk in iter_ndjson_chunks():
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
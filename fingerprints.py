@@ -0,0 +1,60 @@
+from sqlalchemy import bindparam
+from models import db, Entry, Config as ConfigModel
+from encryption import encryption_service, entry_aad
+
+REBUILD_BATCH_SIZE = 500
+
+def fingerprint(password: str) -> str:
+    return encryption_service.password_fingerprint(password)
+
+def rebuild():
+    statement = (Entry.__table__.update()
+                 .where(Entry.__table__.c.id == bindparam('_id'))
+                 .values(password_fingerprint=bindparam('_fingerprint'),
+                         updated_at=Entry.__table__.c.updated_at))
+    
+    last_id = 0
+    while True:
+        batch = (db.session.query(Entry.id, Entry.password)
+                 .filter(Entry.id > last_id)
+                 .order_by(Entry.id)
+                 .limit(REBUILD_BATCH_SIZE)
+                 .all())
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        
+        passwords = encryption_service.decrypt_many([row[1] for row in batch], strict=False,
+                                                    associated_data=[entry_aad(row[0], 'password') for row in batch])
+        params = [{'_id': entry_id, '_fingerprint': fingerprint(password) if password else None}
+                  for (entry_id, _), password in zip(batch, passwords)]
+        db.session.execute(statement, params)
+    
+    config = ConfigModel.query.first()
+    config.fingerprint_key_id = encryption_service.fingerprint_key_id()
+    db.session.commit()
+
+def ensure_current():
+    config = ConfigModel.query.first()
+    if config and config.fingerprint_key_id != encryption_service.fingerprint_key_id():
+        rebuild()
+
+def reused_passwords():
+    duplicates = (db.select(Entry.password_fingerprint)
+                  .where(Entry.password_fingerprint.is_not(None))
+                  .group_by(Entry.password_fingerprint)
+                  .having(db.func.count(Entry.id) > 1))
+    rows = (db.session.query(Entry.password_fingerprint, Entry.id, Entry.title, Entry.username, Entry.url)
+            .filter(Entry.password_fingerprint.in_(duplicates))
+            .order_by(Entry.password_fingerprint, Entry.id)
+            .all())
+    
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.password_fingerprint, []).append({
+            'id': row.id,
+            'title': row.title,
+            'username': row.username,
+            'url': row.url
+        })
+    return sorted(groups.values(), key=len, reverse=True)
@@ -0,0 +1,65 @@
+from models import db, Config as ConfigModel
+from encryption import FORMAT_AES_GCM
+from key_rotation import ROTATION_TARGETS, rotate_batch, key_lock
+import threading
+
+class MigrationState:
+    def __init__(self):
+        self.thread = None
+        self.migrated = 0
+        self.error = None
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+state = MigrationState()
+
+def rotation_pending():
+    db.session.expire_all()
+    config = ConfigModel.query.first()
+    return config is None or bool(config.pending_vault_key)
+
+def run_migration(app):
+    try:
+        with app.app_context():
+            for _, model, columns, aad in ROTATION_TARGETS:
+                last_id = 0
+                while True:
+                    if rotation_pending():
+                        return
+                    last_id, migrated = rotate_batch(None, model, columns, aad, last_id, legacy_only=True)
+                    if last_id is None:
+                        break
+                    db.session.commit()
+                    state.migrated += migrated
+    except Exception as e:
+        state.error = str(e)
+
+def resume(app):
+    with key_lock:
+        if state.running:
+            return
+        state.error = None
+        state.thread = threading.Thread(target=run_migration, args=(app,), daemon=True)
+        state.thread.start()
+
+def legacy_count():
+    total = 0
+    for _, model, columns, _ in ROTATION_TARGETS:
+        for name in columns:
+            column = model.__table__.c[name]
+            total += (db.session.query(db.func.count())
+                      .select_from(model.__table__)
+                      .filter(db.func.length(column) > 0)
+                      .filter(db.func.substr(column, 1, 1) != bytes([FORMAT_AES_GCM]))
+                      .scalar())
+    return total
+
+def status():
+    return {
+        'running': state.running,
+        'migrated': state.migrated,
+        'remaining': legacy_count(),
+        'error': state.error
+    }
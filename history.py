@@ -0,0 +1,188 @@
+from flask import current_app
+from models import db, EntryRevision
+from encryption import encryption_service
+from datetime import datetime, timedelta
+import difflib
+import json
+import struct
+import zlib
+
+SNAPSHOT_INTERVAL = 10
+MAX_DIFF_LENGTH = 64 * 1024
+FIELDS = ('title', 'username', 'password', 'url', 'notes', 'category_id', 'tags')
+TEXT_FIELDS = ('title', 'username', 'password', 'url', 'notes')
+REVISION_HEADER = struct.Struct('<QI?')
+
+class CorruptRevisionError(Exception):
+    pass
+
+def entry_state(entry, password: str, notes: str) -> dict:
+    return {
+        'title': entry.title,
+        'username': entry.username or '',
+        'password': password,
+        'url': entry.url or '',
+        'notes': notes or '',
+        'category_id': entry.category_id,
+        'tags': sorted(tag.name for tag in entry.tags)
+    }
+
+def text_delta(old: str, new: str):
+    if len(old) > MAX_DIFF_LENGTH or len(new) > MAX_DIFF_LENGTH:
+        return new
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(new[j1:j2])
+    if len(json.dumps(ops, ensure_ascii=False)) >= len(json.dumps(new, ensure_ascii=False)):
+        return new
+    return ops
+
+def apply_text_delta(old: str, delta) -> str:
+    if isinstance(delta, str):
+        return delta
+    return ''.join(old[op[0]:op[1]] if isinstance(op, list) else op for op in delta)
+
+def make_delta(base: dict, state: dict) -> dict:
+    delta = {}
+    for field in FIELDS:
+        if base[field] == state[field]:
+            continue
+        delta[field] = text_delta(base[field], state[field]) if field in TEXT_FIELDS else state[field]
+    return delta
+
+def apply_delta(base: dict, delta: dict) -> dict:
+    state = dict(base)
+    for field, value in delta.items():
+        state[field] = apply_text_delta(base[field], value) if field in TEXT_FIELDS else value
+    return state
+
+def seal(entry_id, revision, is_snapshot, document) -> bytes:
+    body = zlib.compress(json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+    return encryption_service.encrypt_bytes(REVISION_HEADER.pack(entry_id, revision, is_snapshot) + body)
+
+def unseal(row) -> dict:
+    plaintext = encryption_service.decrypt_bytes(row.payload)
+    header = REVISION_HEADER.unpack_from(plaintext)
+    if header != (row.entry_id, row.revision, row.is_snapshot):
+        raise CorruptRevisionError(f'Entry {row.entry_id} revision {row.revision} is out of place')
+    return json.loads(zlib.decompress(plaintext[REVISION_HEADER.size:]))
+
+def latest_snapshot(entry_id, revision=None):
+    query = (db.session.query(db.func.max(EntryRevision.revision))
+             .filter(EntryRevision.entry_id == entry_id)
+             .filter(EntryRevision.is_snapshot.is_(True)))
+    if revision is not None:
+        query = query.filter(EntryRevision.revision <= revision)
+    return query.scalar()
+
+def reconstruct(entry_id, revision) -> dict:
+    snapshot = latest_snapshot(entry_id, revision)
+    if snapshot is None:
+        raise CorruptRevisionError(f'Entry {entry_id} revision {revision} has no snapshot')
+    rows = (EntryRevision.query
+            .filter(EntryRevision.entry_id == entry_id)
+            .filter(EntryRevision.revision.between(snapshot, revision))
+            .order_by(EntryRevision.revision)
+            .all())
+    if [row.revision for row in rows] != list(range(snapshot, revision + 1)):
+        raise CorruptRevisionError(f'Entry {entry_id} history is missing revisions before {revision}')
+    
+    state = unseal(rows[0])
+    for row in rows[1:]:
+        state = apply_delta(state, unseal(row))
+    return state
+
+def record(entry, old_state: dict, new_state: dict):
+    changed = [field for field in FIELDS if old_state[field] != new_state[field]]
+    if not changed:
+        return None
+    
+    latest = (db.session.query(db.func.max(EntryRevision.revision))
+              .filter(EntryRevision.entry_id == entry.id)
+              .scalar())
+    revision = (latest or 0) + 1
+    snapshot = latest_snapshot(entry.id)
+    document = old_state
+    is_snapshot = True
+    if snapshot is not None and revision - snapshot < SNAPSHOT_INTERVAL:
+        delta = make_delta(reconstruct(entry.id, latest), old_state)
+        if len(json.dumps(delta, ensure_ascii=False)) < len(json.dumps(old_state, ensure_ascii=False)):
+            document = delta
+            is_snapshot = False
+    
+    db.session.add(EntryRevision(
+        entry_id=entry.id,
+        revision=revision,
+        is_snapshot=is_snapshot,
+        changed_fields=','.join(changed),
+        payload=seal(entry.id, revision, is_snapshot, document)
+    ))
+    db.session.flush()
+    prune(entry.id)
+    return revision
+
+def prune(entry_id):
+    max_revisions = current_app.config.get('HISTORY_MAX_REVISIONS') or 0
+    max_age_days = current_app.config.get('HISTORY_MAX_AGE_DAYS') or 0
+    
+    cutoff = None
+    if max_revisions:
+        cutoff = (db.session.query(EntryRevision.revision)
+                  .filter(EntryRevision.entry_id == entry_id)
+                  .order_by(EntryRevision.revision.desc())
+                  .offset(max_revisions - 1)
+                  .limit(1)
+                  .scalar())
+    if max_age_days:
+        oldest_kept = (db.session.query(db.func.min(EntryRevision.revision))
+                       .filter(EntryRevision.entry_id == entry_id)
+                       .filter(EntryRevision.created_at >= datetime.utcnow() - timedelta(days=max_age_days))
+                       .scalar())
+        if oldest_kept is None:
+            oldest_kept = (db.session.query(db.func.max(EntryRevision.revision))
+                           .filter(EntryRevision.entry_id == entry_id)
+                           .scalar()) + 1
+        cutoff = max(cutoff or 0, oldest_kept)
+    if not cutoff:
+        return
+    
+    first = (EntryRevision.query
+             .filter(EntryRevision.entry_id == entry_id)
+             .filter(EntryRevision.revision >= cutoff)
+             .order_by(EntryRevision.revision)
+             .first())
+    if first is not None and not first.is_snapshot:
+        state = reconstruct(entry_id, first.revision)
+        first.is_snapshot = True
+        first.payload = seal(entry_id, first.revision, True, state)
+    
+    db.session.execute(EntryRevision.__table__.delete()
+                       .where(EntryRevision.entry_id == entry_id)
+                       .where(EntryRevision.revision < cutoff))
+
+def page(entry_id, limit, before=None):
+    query = (db.session.query(EntryRevision.revision, EntryRevision.is_snapshot,
+                              EntryRevision.changed_fields, EntryRevision.created_at)
+             .filter(EntryRevision.entry_id == entry_id))
+    if before is not None:
+        query = query.filter(EntryRevision.revision < before)
+    rows = query.order_by(EntryRevision.revision.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        'revisions': [{
+            'revision': row.revision,
+            'snapshot': row.is_snapshot,
+            'changed_fields': row.changed_fields.split(',') if row.changed_fields else [],
+            'created_at': row.created_at.isoformat()
+        } for row in rows],
+        'next_before': rows[-1].revision if has_more else None
+    }
+
+def delete_for_entries(entry_ids):
+    db.session.execute(EntryRevision.__table__.delete().where(EntryRevision.entry_id.in_(entry_ids)))
@@ -0,0 +1,292 @@
+from sqlalchemy import bindparam
+from models import db, Entry, Category, Tag, NoteToken, entry_tags
+from encryption import encryption_service, entry_aad
+from search_index import search_index
+import blind_index
+import delta_sync
+import fingerprints
+from datetime import datetime
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+import threading
+import uuid
+
+IMPORT_BATCH_SIZE = 1000
+SPOOL_CHUNK_SIZE = 64 * 1024
+MAX_FINISHED_JOBS = 20
+
+DECOMPRESSORS = {
+    'gzip': gzip.open,
+    'lzma': lzma.open
+}
+
+jobs = {}
+jobs_lock = threading.Lock()
+
+class ImportJob:
+    def __init__(self, path, compression, total_bytes):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.compression = compression
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.status = 'queued'
+        self.processed = 0
+        self.imported = 0
+        self.skipped = 0
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+    
+    def to_dict(self):
+        progress = self.bytes_read / self.total_bytes if self.total_bytes else 0
+        if self.status == 'completed':
+            progress = 1
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': round(progress, 4),
+            'processed': self.processed,
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+def document_records(data):
+    for cat_data in data.get('categories', []):
+        yield {'type': 'category', **cat_data}
+    for tag_data in data.get('tags', []):
+        yield {'type': 'tag', **tag_data}
+    for entry_data in data.get('entries', []):
+        yield {'type': 'entry', **entry_data}
+
+def ndjson_records(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def resolve_categories(records):
+    names = {}
+    for record in records:
+        names.setdefault(record['name'], record)
+    if not names:
+        return
+    
+    existing = {name for (name,) in
+                db.session.query(Category.name).filter(Category.name.in_(list(names)))}
+    missing = [{'name': name,
+                'icon': record.get('icon', 'folder'),
+                'color': record.get('color', '#6366f1')}
+               for name, record in names.items() if name not in existing]
+    if missing:
+        db.session.execute(Category.__table__.insert(), missing)
+
+def resolve_tags(names):
+    if not names:
+        return {}
+    
+    names = list(names)
+    tag_ids = dict(db.session.query(Tag.name, Tag.id).filter(Tag.name.in_(names)))
+    missing = [{'name': name} for name in names if name not in tag_ids]
+    if missing:
+        db.session.execute(Tag.__table__.insert(), missing)
+        tag_ids.update(db.session.query(Tag.name, Tag.id).filter(
+            Tag.name.in_([row['name'] for row in missing])))
+    return tag_ids
+
+def insert_entries(records, category_ids):
+    tag_names = set()
+    for record in records:
+        tag_names.update(record.get('tags') or [])
+    tag_ids = resolve_tags(tag_names)
+    
+    now = datetime.utcnow()
+    change_seq = delta_sync.next_change_seq()
+    rows = []
+    for record in records:
+        category_id = record.get('category_id')
+        rows.append({
+            'title': record['title'],
+            'username': record.get('username', ''),
+            'password': b'',
+            'password_fingerprint': fingerprints.fingerprint(record['password']),
+            'url': record.get('url', ''),
+            'notes': b'',
+            'category_id': category_id if category_id in category_ids else None,
+            'is_favorite': bool(record.get('is_favorite', False)),
+            'created_at': now,
+            'updated_at': now,
+            'change_seq': change_seq
+        })
+    
+    result = db.session.execute(
+        db.insert(Entry).returning(Entry.id, sort_by_parameter_order=True), rows)
+    entry_ids = [row[0] for row in result]
+    
+    passwords = encryption_service.encrypt_many(
+        [record['password'] for record in records],
+        associated_data=[entry_aad(entry_id, 'password') for entry_id in entry_ids])
+    notes = encryption_service.encrypt_many(
+        [record.get('notes') or '' for record in records],
+        associated_data=[entry_aad(entry_id, 'notes') for entry_id in entry_ids])
+    db.session.execute(
+        Entry.__table__.update()
+        .where(Entry.__table__.c.id == bindparam('_id'))
+        .values(password=bindparam('_password'), notes=bindparam('_notes')),
+        [{'_id': entry_id, '_password': password, '_notes': note}
+         for entry_id, password, note in zip(entry_ids, passwords, notes)])
+    
+    link_rows = []
+    token_rows = []
+    index_blind = blind_index.enabled()
+    for entry_id, record in zip(entry_ids, records):
+        for name in dict.fromkeys(record.get('tags') or []):
+            link_rows.append({'entry_id': entry_id, 'tag_id': tag_ids[name]})
+        if index_blind and record.get('notes'):
+            token_rows.extend({'entry_id': entry_id, 'token': token}
+                              for token in blind_index.note_tokens(record['notes']))
+    if link_rows:
+        db.session.execute(entry_tags.insert(), link_rows)
+    if token_rows:
+        db.session.execute(NoteToken.__table__.insert(), token_rows)
+    
+    return entry_ids
+
+def import_batch(batch):
+    categories = [record for record in batch if record.get('type') == 'category']
+    tags = [record['name'] for record in batch if record.get('type') == 'tag']
+    entries = [record for record in batch
+               if record.get('type', 'entry') == 'entry' and record.get('title') and 'password' in record]
+    
+    resolve_categories(categories)
+    resolve_tags(tags)
+    
+    entry_ids = []
+    if entries:
+        category_ids = {category_id for (category_id,) in db.session.query(Category.id)}
+        entry_ids = insert_entries(entries, category_ids)
+    
+    skipped = len(batch) - len(categories) - len(tags) - len(entries)
+    return list(zip(entry_ids, entries)), skipped
+
+def index_documents(documents):
+    for entry_id, record in documents:
+        search_index.add_document(entry_id, record['title'], record.get('username', ''),
+                                  record.get('url', ''), record.get('tags') or [])
+
+def import_records(records, batch_size=IMPORT_BATCH_SIZE, on_batch=None, atomic=False):
+    imported = 0
+    skipped = 0
+    pending = []
+    
+    def flush(batch):
+        nonlocal imported, skipped
+        documents, dropped = import_batch(batch)
+        imported += len(documents)
+        skipped += dropped
+        if atomic:
+            pending.extend(documents)
+        else:
+            db.session.commit()
+            index_documents(documents)
+        if on_batch:
+            on_batch(imported, skipped)
+    
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    
+    if atomic:
+        db.session.commit()
+        index_documents(pending)
+    return imported, skipped
+
+def spool_upload(stream):
+    fd, path = tempfile.mkstemp(prefix='import-', suffix='.ndjson')
+    total = 0
+    with os.fdopen(fd, 'wb') as spool:
+        while True:
+            chunk = stream.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            spool.write(chunk)
+            total += len(chunk)
+    return path, total
+
+class CountingReader(io.RawIOBase):
+    def __init__(self, raw, job):
+        self.raw = raw
+        self.job = job
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        n = self.raw.readinto(buffer)
+        self.job.bytes_read += n or 0
+        return n
+
+def run_job(app, job):
+    job.status = 'running'
+    try:
+        with app.app_context(), open(job.path, 'rb') as raw:
+            counted = io.BufferedReader(CountingReader(raw, job))
+            if job.compression:
+                binary = DECOMPRESSORS[job.compression](counted)
+            else:
+                binary = counted
+            text = io.TextIOWrapper(binary, encoding='utf-8')
+            
+            def on_batch(imported, skipped):
+                job.imported = imported
+                job.skipped = skipped
+                job.processed = imported + skipped
+            
+            try:
+                import_records(ndjson_records(text), on_batch=on_batch)
+            except Exception:
+                db.session.rollback()
+                raise
+        job.status = 'completed'
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = datetime.utcnow()
+        os.unlink(job.path)
+
+def prune_jobs():
+    finished = sorted((job for job in jobs.values() if job.finished_at),
+                      key=lambda job: job.finished_at)
+    for job in finished[:-MAX_FINISHED_JOBS]:
+        del jobs[job.id]
+
+def start_job(app, stream, compression=None):
+    if compression and compression not in DECOMPRESSORS:
+        raise ValueError('Unsupported compression')
+    
+    with jobs_lock:
+        if any(job.status in ('queued', 'running') for job in jobs.values()):
+            raise RuntimeError('Another import is already running')
+        path, total = spool_upload(stream)
+        job = ImportJob(path, compression, total)
+        prune_jobs()
+        jobs[job.id] = job
+    
+    threading.Thread(target=run_job, args=(app, job), daemon=True).start()
+    return job
+
+def get_job(job_id):
+    return jobs.get(job_id)
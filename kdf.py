@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from encryption import encryption_service, DEFAULT_KDF_PARAMS
+from config import Config
+import argparse
+import contextvars
+import json
+import os
+import threading
+import time
+
+CALIBRATION_SALT = b'kdf-calibration!'
+MIN_TIME_COST = 2
+MAX_TIME_COST = 20
+
+class LoginBusyError(Exception):
+    pass
+
+_params_cache = {}
+
+def load_params(path=None) -> dict:
+    path = path or Config.KDF_PARAMS_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return dict(DEFAULT_KDF_PARAMS)
+    
+    cached = _params_cache.get(path)
+    if cached and cached[0] == mtime:
+        return dict(cached[1])
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        stored = json.load(f)
+    params = {key: int(stored.get(key, value)) for key, value in DEFAULT_KDF_PARAMS.items()}
+    _params_cache[path] = (mtime, params)
+    return dict(params)
+
+def save_params(params: dict, path=None):
+    path = path or Config.KDF_PARAMS_PATH
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+
+def time_derivation(params: dict, rounds: int = 3) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        encryption_service.derive_unlock_keys('calibration', CALIBRATION_SALT, params)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def calibrate(target_ms: int, memory_cost: int, parallelism: int) -> tuple:
+    params = {'time_cost': MIN_TIME_COST, 'memory_cost': memory_cost, 'parallelism': parallelism}
+    elapsed = time_derivation(params)
+    
+    while elapsed * 1000 < target_ms and params['time_cost'] < MAX_TIME_COST:
+        per_pass = elapsed / params['time_cost']
+        wanted = int(target_ms / 1000 / per_pass) if per_pass else params['time_cost'] + 1
+        params['time_cost'] = min(max(wanted, params['time_cost'] + 1), MAX_TIME_COST)
+        elapsed = time_derivation(params)
+    
+    while elapsed * 1000 > target_ms * 1.25 and params['time_cost'] > MIN_TIME_COST:
+        params['time_cost'] -= 1
+        elapsed = time_derivation(params)
+    
+    return params, elapsed
+
+class LoginGate:
+    def __init__(self, concurrency: int, queue_timeout: float):
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='kdf')
+    
+    def run(self, func, *args):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise LoginBusyError('Too many unlock attempts in progress')
+        try:
+            return self.executor.submit(contextvars.copy_context().run, func, *args).result()
+        finally:
+            self.slots.release()
+
+login_gate = LoginGate(Config.LOGIN_CONCURRENCY, Config.LOGIN_QUEUE_TIMEOUT)
+
+def main():
+    parser = argparse.ArgumentParser(description='Calibrate the master password key derivation cost')
+    parser.add_argument('--target-ms', type=int, default=500)
+    parser.add_argument('--memory-kib', type=int, default=DEFAULT_KDF_PARAMS['memory_cost'])
+    parser.add_argument('--parallelism', type=int, default=DEFAULT_KDF_PARAMS['parallelism'])
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    
+    params, elapsed = calibrate(args.target_ms, args.memory_kib, args.parallelism)
+    print(f"Argon2id time_cost={params['time_cost']} memory_cost={params['memory_cost']} KiB "
+          f"parallelism={params['parallelism']}: {elapsed * 1000:.0f} ms")
+    
+    if not args.dry_run:
+        save_params(params)
+        print(f'Saved to {Config.KDF_PARAMS_PATH}; existing vaults upgrade on next login')
+
+if __name__ == '__main__':
+    main()
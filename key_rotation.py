@@ -0,0 +1,144 @@
+from sqlalchemy import bindparam
+from models import db, Entry, Attachment, AttachmentChunk, EntryRevision, Config as ConfigModel
+from encryption import encryption_service, entry_aad, attachment_aad, is_legacy_token, FORMAT_AES_GCM
+import blind_index
+import fingerprints
+import threading
+
+ROTATION_BATCH_SIZE = 200
+
+ROTATION_TARGETS = [
+    ('entry', Entry, ('password', 'notes'), entry_aad),
+    ('attachment', Attachment, ('name',), attachment_aad),
+    ('attachment_chunk', AttachmentChunk, ('data',), None),
+    ('entry_revision', EntryRevision, ('payload',), None),
+]
+
+key_lock = threading.RLock()
+
+class RotationState:
+    def __init__(self):
+        self.thread = None
+        self.rotated = 0
+        self.error = None
+    
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+state = RotationState()
+
+def parse_checkpoint(checkpoint):
+    if not checkpoint:
+        return 0, 0
+    name, last_id = checkpoint.split(':')
+    for index, (target_name, _, _, _) in enumerate(ROTATION_TARGETS):
+        if target_name == name:
+            return index, int(last_id)
+    raise ValueError(f'Unknown rotation checkpoint {checkpoint}')
+
+def rotate_batch(cipher, model, columns, aad, last_id, legacy_only=False):
+    id_column = model.__table__.c.id
+    query = (db.session.query(id_column, *[model.__table__.c[name] for name in columns])
+             .filter(id_column > last_id))
+    if legacy_only:
+        query = query.filter(db.or_(*[db.func.substr(model.__table__.c[name], 1, 1) != bytes([FORMAT_AES_GCM])
+                                      for name in columns]))
+    rows = query.order_by(id_column).limit(ROTATION_BATCH_SIZE).all()
+    if not rows:
+        return None, 0
+    
+    rotated = 0
+    for position, name in enumerate(columns, start=1):
+        column = model.__table__.c[name]
+        params = [{'_id': row[0], '_old': row[position],
+                   '_new': encryption_service.reencrypt(row[position], aad(row[0], name) if aad else None,
+                                                        keyring=cipher)}
+                  for row in rows if row[position] and (not legacy_only or is_legacy_token(row[position]))]
+        if not params:
+            continue
+        values = {name: bindparam('_new')}
+        if 'updated_at' in model.__table__.c:
+            values['updated_at'] = model.__table__.c.updated_at
+        statement = (model.__table__.update()
+                     .where(id_column == bindparam('_id'))
+                     .where(column == bindparam('_old'))
+                     .values(**values))
+        db.session.execute(statement, params)
+        rotated += len(params)
+    
+    return rows[-1][0], rotated
+
+def finish_rotation():
+    with key_lock:
+        db.session.expire_all()
+        config = ConfigModel.query.first()
+        new_key = encryption_service.vault_key
+        if not new_key or not encryption_service.previous_vault_key:
+            return False
+        config.encrypted_vault_key = config.pending_vault_key
+        config.pending_vault_key = None
+        config.rotation_checkpoint = None
+        db.session.commit()
+        encryption_service.set_vault_key(new_key)
+        blind_index.ensure_current()
+        fingerprints.ensure_current()
+    return True
+
+def run_rotation(app):
+    try:
+        with app.app_context():
+            config = ConfigModel.query.first()
+            target_index, last_id = parse_checkpoint(config.rotation_checkpoint)
+            
+            while target_index < len(ROTATION_TARGETS):
+                if not encryption_service.previous_vault_key:
+                    return
+                cipher = encryption_service.rotation_cipher()
+                name, model, columns, aad = ROTATION_TARGETS[target_index]
+                
+                batch_last_id, rotated = rotate_batch(cipher, model, columns, aad, last_id)
+                if batch_last_id is None:
+                    target_index += 1
+                    last_id = 0
+                    continue
+                
+                last_id = batch_last_id
+                config.rotation_checkpoint = f'{name}:{last_id}'
+                db.session.commit()
+                state.rotated += rotated
+            
+            finish_rotation()
+    except Exception as e:
+        state.error = str(e)
+
+def resume(app):
+    with key_lock:
+        if state.running:
+            return
+        state.error = None
+        state.thread = threading.Thread(target=run_rotation, args=(app,), daemon=True)
+        state.thread.start()
+
+def begin(app, config, wrapping_key: bytes):
+    with key_lock:
+        if config.pending_vault_key:
+            raise RuntimeError('Vault key rotation already in progress')
+        old_key = encryption_service.vault_key
+        new_key = encryption_service.generate_vault_key()
+        config.pending_vault_key = encryption_service.encrypt_vault_key(new_key, wrapping_key)
+        config.rotation_checkpoint = None
+        db.session.commit()
+        encryption_service.set_vault_key(new_key, previous_key=old_key)
+        state.rotated = 0
+    resume(app)
+
+def status(config):
+    checkpoint = config.rotation_checkpoint if config else None
+    return {
+        'active': bool(config and config.pending_vault_key),
+        'running': state.running,
+        'checkpoint': checkpoint,
+        'rotated': state.rotated,
+        'error': state.error
+    }
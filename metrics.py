@@ -0,0 +1,177 @@
+from flask import request, Response
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from models import db
+import bisect
+import contextvars
+import functools
+import threading
+import time
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def format_labels(self, labels, extra=None):
+        pairs = list(zip(self.label_names, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            snapshot = sorted((labels, list(counts), total, count)
+                              for labels, (counts, total, count) in self.series.items())
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{self.format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{self.name}_bucket{self.format_labels(labels, ("le", "+Inf"))} {count}')
+            lines.append(f'{self.name}_sum{self.format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{self.format_labels(labels)} {count}')
+        return lines
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.phases = {}
+    
+    def add(self, phase, elapsed):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed
+
+request_duration = Histogram(
+    'passwordmanager_request_duration_seconds', 'Request latency by endpoint.',
+    ('endpoint', 'method', 'status'))
+request_phase_duration = Histogram(
+    'passwordmanager_request_phase_seconds', 'Time spent per request in SQL, crypto and JSON.',
+    ('endpoint', 'phase'))
+request_queries = Histogram(
+    'passwordmanager_request_queries', 'SQL statements executed per request.',
+    ('endpoint',), QUERY_COUNT_BUCKETS)
+query_duration = Histogram(
+    'passwordmanager_sql_query_duration_seconds', 'SQL statement latency.', ())
+crypto_duration = Histogram(
+    'passwordmanager_crypto_duration_seconds', 'Encryption service operation latency.',
+    ('operation',))
+
+HISTOGRAMS = [request_duration, request_phase_duration, request_queries, query_duration, crypto_duration]
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+def record(phase, elapsed):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, elapsed)
+
+def timed(operation, phase='crypto'):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                crypto_duration.observe(elapsed, operation)
+                record(phase, elapsed)
+        return wrapper
+    return decorator
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record('json', time.perf_counter() - start)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    query_duration.observe(elapsed)
+    timings = _current.get()
+    if timings is not None:
+        timings.queries += 1
+        timings.add('sql', elapsed)
+
+def start_request():
+    if request.blueprint is None:
+        return
+    request.metrics_token = _current.set(RequestTimings())
+
+def finish_request(response, app):
+    timings = _current.get()
+    if getattr(request, 'metrics_token', None) is None or timings is None:
+        return response
+    
+    elapsed = time.perf_counter() - timings.started
+    endpoint = request.endpoint or 'unknown'
+    request_duration.observe(elapsed, endpoint, request.method, str(response.status_code))
+    request_queries.observe(timings.queries, endpoint)
+    for phase, phase_elapsed in timings.phases.items():
+        request_phase_duration.observe(phase_elapsed, endpoint, phase)
+    
+    slow_ms = app.config.get('SLOW_REQUEST_MS')
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        phases = ' '.join(f'{phase}={value * 1000:.1f}ms' for phase, value in sorted(timings.phases.items()))
+        app.logger.warning('Slow request %s %s -> %s in %.1fms (%d queries) %s',
+                           request.method, request.full_path.rstrip('?'), response.status_code,
+                           elapsed * 1000, timings.queries, phases)
+    
+    return response
+
+def end_request(exc=None):
+    token = getattr(request, 'metrics_token', None)
+    if token is not None:
+        request.metrics_token = None
+        _current.reset(token)
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
+
+def metrics_response():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    
+    app.json = InstrumentedJSONProvider(app)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+    app.before_request(start_request)
+    app.after_request(functools.partial(finish_request, app=app))
+    app.teardown_request(end_request)
@@ -10,6 +10,11 @@ class Config(db.Model):
     master_password_hash = db.Column(db.String(256), nullable=False)
     encrypted_vault_key = db.Column(db.LargeBinary, nullable=False)
     salt = db.Column(db.LargeBinary, nullable=False)
+    kdf_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    kdf_params = db.Column(db.String(200))
+    pending_vault_key = db.Column(db.LargeBinary)
+    rotation_checkpoint = db.Column(db.String(100))
+    fingerprint_key_id = db.Column(db.String(32))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Category(db.Model):
@@ -29,22 +34,98 @@ class Tag(db.Model):
 
 entry_tags = db.Table('entry_tags',
     db.Column('entry_id', db.Integer, db.ForeignKey('entry.id'), primary_key=True),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True)
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    db.Index('ix_entry_tags_tag_id', 'tag_id')
 )
 
 class Entry(db.Model):
     __tablename__ = 'entry'
     
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(200), nullable=False, index=True)
     username = db.Column(db.String(200))
     password = db.Column(db.LargeBinary, nullable=False)
+    password_fingerprint = db.Column(db.String(32), index=True)
     url = db.Column(db.String(500))
     notes = db.Column(db.LargeBinary)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
-    is_favorite = db.Column(db.Boolean, default=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), index=True)
+    is_favorite = db.Column(db.Boolean, default=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     
     tags = db.relationship('Tag', secondary=entry_tags, lazy='subquery',
                           backref=db.backref('entries', lazy=True))
+    note_tokens = db.relationship('NoteToken', backref='entry', lazy=True, cascade='all, delete-orphan')
+    password_score = db.relationship('PasswordScore', backref='entry', lazy=True, uselist=False,
+                                     cascade='all, delete-orphan')
+
+class Tombstone(db.Model):
+    __tablename__ = 'tombstone'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    change_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    change_seq = db.Column(db.Integer, nullable=False, default=0)
+    pruned_seq = db.Column(db.Integer, nullable=False, default=0)
+
+class NoteToken(db.Model):
+    __tablename__ = 'note_token'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('entry.id'), nullable=False, index=True)
+    token = db.Column(db.String(32), nullable=False, index=True)
+
+class BlindIndexState(db.Model):
+    __tablename__ = 'blind_index_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key_id = db.Column(db.String(32), nullable=False)
+
+class PasswordScore(db.Model):
+    __tablename__ = 'password_score'
+    
+    entry_id = db.Column(db.Integer, db.ForeignKey('entry.id'), primary_key=True)
+    password_digest = db.Column(db.String(32), nullable=False)
+    score = db.Column(db.Integer, nullable=False, index=True)
+    guesses_log10 = db.Column(db.Float, nullable=False)
+    patterns = db.Column(db.String(200))
+
+class Attachment(db.Model):
+    __tablename__ = 'attachment'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('entry.id'), nullable=False, index=True)
+    name = db.Column(db.LargeBinary, nullable=False)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    chunk_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttachmentChunk(db.Model):
+    __tablename__ = 'attachment_chunk'
+    __table_args__ = (db.UniqueConstraint('attachment_id', 'seq', name='uq_attachment_chunk_seq'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    attachment_id = db.Column(db.Integer, db.ForeignKey('attachment.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+class EntryRevision(db.Model):
+    __tablename__ = 'entry_revision'
+    __table_args__ = (db.UniqueConstraint('entry_id', 'revision', name='uq_entry_revision'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entry_id = db.Column(db.Integer, db.ForeignKey('entry.id'), nullable=False)
+    revision = db.Column(db.Integer, nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    changed_fields = db.Column(db.String(100))
+    payload = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -1,52 +1,164 @@
+import os
 import secrets
 import string
+import sys
+import threading
+
+SYMBOLS = '!@#$%^&*()_+-=[]{}|;:,.<>?'
+AMBIGUOUS = 'Il1|O0o`\'"'
+CHARACTER_CLASSES = {
+    'lowercase': string.ascii_lowercase,
+    'uppercase': string.ascii_uppercase,
+    'digits': string.digits,
+    'symbols': SYMBOLS
+}
+
+RANDOM_BLOCK_SIZE = 4096
+MAX_CANDIDATES = 1000
+MAX_LENGTH = 1024
+MAX_WORDS = 64
+
+def wordlist_path(name='eff_large_wordlist.txt'):
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, 'wordlists', name)
+
+class RandomSource:
+    def __init__(self, expected_bytes=0):
+        self.buffer = b''
+        self.position = 0
+        self.expected_bytes = expected_bytes
+    
+    def take(self, size):
+        if self.position + size > len(self.buffer):
+            refill = max(RANDOM_BLOCK_SIZE, self.expected_bytes, size)
+            self.buffer = self.buffer[self.position:] + secrets.token_bytes(refill)
+            self.position = 0
+            self.expected_bytes = 0
+        chunk = self.buffer[self.position:self.position + size]
+        self.position += size
+        return chunk
+    
+    def below(self, bound):
+        if bound <= 1:
+            return 0
+        width = 1 if bound <= 256 else 2 if bound <= 65536 else 4
+        space = 1 << (8 * width)
+        limit = space - space % bound
+        while True:
+            value = int.from_bytes(self.take(width), 'big')
+            if value < limit:
+                return value % bound
+    
+    def choices(self, population, count):
+        return [population[self.below(len(population))] for _ in range(count)]
+    
+    def shuffle(self, items):
+        for i in range(len(items) - 1, 0, -1):
+            j = self.below(i + 1)
+            items[i], items[j] = items[j], items[i]
 
 class PasswordGenerator:
+    def __init__(self):
+        self._words = None
+        self._words_lock = threading.Lock()
+    
+    @property
+    def words(self):
+        if self._words is None:
+            with self._words_lock:
+                if self._words is None:
+                    with open(wordlist_path(), 'r', encoding='utf-8') as f:
+                        self._words = [line.split()[-1] for line in f if line.strip()]
+        return self._words
+    
     @staticmethod
-    def generate(length=16, use_uppercase=True, use_lowercase=True, 
-                 use_digits=True, use_symbols=True):
-        characters = ''
+    def build_policy(length=16, use_uppercase=True, use_lowercase=True, use_digits=True,
+                     use_symbols=True, minimums=None, exclude='', exclude_ambiguous=False):
+        if not 1 <= length <= MAX_LENGTH:
+            raise ValueError(f'Length must be between 1 and {MAX_LENGTH}')
+        
+        enabled = {
+            'lowercase': use_lowercase,
+            'uppercase': use_uppercase,
+            'digits': use_digits,
+            'symbols': use_symbols
+        }
+        if not any(enabled.values()):
+            enabled.update(lowercase=True, uppercase=True, digits=True)
         
-        if use_lowercase:
-            characters += string.ascii_lowercase
-        if use_uppercase:
-            characters += string.ascii_uppercase
-        if use_digits:
-            characters += string.digits
-        if use_symbols:
-            characters += '!@#$%^&*()_+-=[]{}|;:,.<>?'
+        excluded = set(exclude or '')
+        if exclude_ambiguous:
+            excluded.update(AMBIGUOUS)
         
-        if not characters:
-            characters = string.ascii_letters + string.digits
+        minimums = minimums or {}
+        classes = []
+        for name, characters in CHARACTER_CLASSES.items():
+            minimum = minimums.get(name)
+            if not enabled[name]:
+                if minimum:
+                    raise ValueError(f'Minimum set for disabled character class {name}')
+                continue
+            allowed = ''.join(c for c in characters if c not in excluded)
+            minimum = 1 if minimum is None else int(minimum)
+            if minimum < 0:
+                raise ValueError(f'Minimum for {name} cannot be negative')
+            if not allowed:
+                if minimum:
+                    raise ValueError(f'All {name} characters are excluded')
+                continue
+            classes.append((allowed, minimum))
         
-        password = ''.join(secrets.choice(characters) for _ in range(length))
+        if not classes:
+            raise ValueError('No characters left to generate from')
+        if sum(minimum for _, minimum in classes) > length:
+            raise ValueError('Character class minimums exceed the password length')
         
-        return password
+        return length, classes, ''.join(allowed for allowed, _ in classes)
     
     @staticmethod
-    def calculate_strength(password):
-        if not password:
-            return 0
-        
-        score = 0
-        length = len(password)
-        
-        if length >= 8:
-            score += 1
-        if length >= 12:
-            score += 1
-        if length >= 16:
-            score += 1
-        
-        if any(c.islower() for c in password):
-            score += 1
-        if any(c.isupper() for c in password):
-            score += 1
-        if any(c.isdigit() for c in password):
-            score += 1
-        if any(c in '!@#$%^&*()_+-=[]{}|;:,.<>?' for c in password):
-            score += 1
+    def generate_from_policy(policy, source):
+        length, classes, alphabet = policy
+        characters = []
+        for allowed, minimum in classes:
+            characters.extend(source.choices(allowed, minimum))
+        characters.extend(source.choices(alphabet, length - len(characters)))
+        source.shuffle(characters)
+        return ''.join(characters)
+    
+    def generate_many(self, count=1, **options):
+        if not 1 <= count <= MAX_CANDIDATES:
+            raise ValueError(f'Count must be between 1 and {MAX_CANDIDATES}')
+        policy = self.build_policy(**options)
+        source = RandomSource(expected_bytes=count * policy[0] * 2)
+        return [self.generate_from_policy(policy, source) for _ in range(count)]
+    
+    def generate(self, length=16, use_uppercase=True, use_lowercase=True,
+                 use_digits=True, use_symbols=True, **options):
+        return self.generate_many(1, length=length, use_uppercase=use_uppercase,
+                                  use_lowercase=use_lowercase, use_digits=use_digits,
+                                  use_symbols=use_symbols, **options)[0]
+    
+    def generate_passphrases(self, count=1, words=6, separator='-', capitalize=False,
+                             include_number=False):
+        if not 1 <= count <= MAX_CANDIDATES:
+            raise ValueError(f'Count must be between 1 and {MAX_CANDIDATES}')
+        if not 1 <= words <= MAX_WORDS:
+            raise ValueError(f'Word count must be between 1 and {MAX_WORDS}')
         
-        return min(score, 5)
+        wordlist = self.words
+        source = RandomSource(expected_bytes=count * (words + 2) * 4)
+        phrases = []
+        for _ in range(count):
+            chosen = source.choices(wordlist, words)
+            if capitalize:
+                chosen = [word.capitalize() for word in chosen]
+            if include_number:
+                position = source.below(len(chosen))
+                chosen[position] += string.digits[source.below(10)]
+            phrases.append(separator.join(chosen))
+        return phrases
 
 password_generator = PasswordGenerator()
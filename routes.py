@@ -1,10 +1,36 @@
-from flask import Blueprint, request, jsonify, render_template, session
+from flask import (Blueprint, request, jsonify, render_template, session, current_app, Response,
+                   stream_with_context, abort)
 from flask_login import login_user, logout_user, login_required, current_user
-from models import db, Entry, Category, Tag, Config as ConfigModel
-from encryption import encryption_service
+from models import db, Entry, Category, Tag, Attachment, EntryRevision, Config as ConfigModel, entry_tags
+from encryption import encryption_service, entry_aad, attachment_aad
 from password_generator import password_generator
-from auth import User, is_setup_complete, setup_master_password, verify_and_unlock, lock_vault
+from search_index import search_index
+from breach import breach_checker
+import blind_index
+import fingerprints
+import export_stream
+import import_jobs
+import delta_sync
+import strength
+import audit
+import metrics
+import assets
+import attachments
+import history
+from auth import (User, is_setup_complete, setup_master_password, verify_and_unlock, lock_vault,
+                  change_master_password, start_key_rotation)
+import key_rotation
+import format_migration
+import backup
+from kdf import LoginBusyError
 import json
+import base64
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+ID_BATCH_SIZE = 500
+FAVICON_CACHE_CONTROL = 'public, max-age=86400'
 
 main_bp = Blueprint('main', __name__)
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -19,20 +45,17 @@ def index():
 
 @main_bp.route('/favicon.ico')
 def favicon():
-    import os
-    import sys
-    if getattr(sys, 'frozen', False):
-        base_path = sys._MEIPASS
-    else:
-        base_path = os.path.dirname(os.path.abspath(__file__))
-    
-    favicon_path = os.path.join(base_path, 'favicon.ico')
-    if os.path.exists(favicon_path):
-        from flask import send_file
-        return send_file(favicon_path, mimetype='image/x-icon')
-    else:
-        from flask import abort
+    asset = assets.registry.get('favicon.ico')
+    if asset is None:
         abort(404)
+    return assets.respond(asset, FAVICON_CACHE_CONTROL)
+
+@main_bp.route('/assets/<path:filename>')
+def asset(filename):
+    match = assets.registry.lookup(filename)
+    if match is None:
+        abort(404)
+    return assets.respond(match)
 
 @main_bp.route('/vault')
 @login_required
@@ -81,7 +104,14 @@ def api_login():
     if not master_password:
         return jsonify({'error': 'Master password required'}), 400
     
-    if verify_and_unlock(master_password):
+    try:
+        unlocked = verify_and_unlock(master_password)
+    except LoginBusyError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    
+    if unlocked:
         user = User('1')
         login_user(user, remember=True)
         return jsonify({'success': True})
@@ -102,34 +132,239 @@ def api_lock():
     logout_user()
     return jsonify({'success': True})
 
+@api_bp.route('/master-password', methods=['POST'])
+@login_required
+def api_change_master_password():
+    data = request.get_json()
+    current_password = data.get('current_password')
+    new_password = data.get('new_password')
+    
+    if not current_password or not new_password:
+        return jsonify({'error': 'Current and new master password required'}), 400
+    
+    try:
+        changed = change_master_password(current_password, new_password)
+    except LoginBusyError as e:
+        return jsonify({'error': str(e)}), 429
+    
+    if not changed:
+        return jsonify({'error': 'Invalid master password'}), 401
+    return jsonify({'success': True})
+
+@api_bp.route('/vault-key/rotate', methods=['POST'])
+@login_required
+def api_rotate_vault_key():
+    data = request.get_json()
+    master_password = data.get('master_password')
+    
+    if not master_password:
+        return jsonify({'error': 'Master password required'}), 400
+    
+    try:
+        started = start_key_rotation(master_password)
+    except LoginBusyError as e:
+        return jsonify({'error': str(e)}), 429
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    if not started:
+        return jsonify({'error': 'Invalid master password'}), 401
+    return jsonify(key_rotation.status(ConfigModel.query.first())), 202
+
+@api_bp.route('/vault-key/rotation', methods=['GET'])
+@login_required
+def api_rotation_status():
+    return jsonify(key_rotation.status(ConfigModel.query.first()))
+
+@api_bp.route('/encryption/migration', methods=['GET'])
+@login_required
+def api_format_migration_status():
+    return jsonify(format_migration.status())
+
+@api_bp.route('/backups', methods=['GET'])
+@login_required
+def list_backups():
+    return jsonify(backup.status(current_app))
+
+@api_bp.route('/backups', methods=['POST'])
+@login_required
+def create_backup():
+    try:
+        manifest = backup.run_backup(current_app._get_current_object())
+    except backup.BackupError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify(backup.summary(manifest)), 201
+
+@api_bp.route('/backups/<backup_id>/verify', methods=['POST'])
+@login_required
+def verify_backup(backup_id):
+    try:
+        result = backup.verify_backup(current_app, backup_id)
+    except FileNotFoundError:
+        return jsonify({'error': 'Backup not found'}), 404
+    except backup.BackupError as e:
+        return jsonify({'error': str(e)}), 409
+    except backup.CorruptBackupError as e:
+        return jsonify({'error': str(e), 'valid': False}), 422
+    return jsonify({'valid': True, **result})
+
+def entry_metadata(entry):
+    return {
+        'id': entry.id,
+        'title': entry.title,
+        'username': entry.username,
+        'url': entry.url,
+        'category_id': entry.category_id,
+        'is_favorite': entry.is_favorite,
+        'created_at': entry.created_at.isoformat(),
+        'updated_at': entry.updated_at.isoformat(),
+        'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
+    }
+
+def decrypt_entries(entries):
+    passwords = encryption_service.decrypt_many(
+        [entry.password for entry in entries], strict=False,
+        associated_data=[entry_aad(entry.id, 'password') for entry in entries])
+    notes = encryption_service.decrypt_many(
+        [entry.notes for entry in entries], strict=False,
+        associated_data=[entry_aad(entry.id, 'notes') for entry in entries])
+    for entry, password, note in zip(entries, passwords, notes):
+        if password is None or note is None:
+            continue
+        yield entry, password, note
+
+def fetch_entries_by_ids(entry_ids):
+    by_id = {}
+    for i in range(0, len(entry_ids), ID_BATCH_SIZE):
+        batch = entry_ids[i:i + ID_BATCH_SIZE]
+        for entry in Entry.query.filter(Entry.id.in_(batch)):
+            by_id[entry.id] = entry
+    return [by_id[entry_id] for entry_id in entry_ids if entry_id in by_id]
+
+def encode_cursor(sort, entry):
+    value = entry.title if sort == 'title' else entry.updated_at.isoformat()
+    raw = json.dumps([value, entry.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    value, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return value, int(entry_id)
+
+def list_entries_page(args):
+    sort = args.get('sort', 'updated_at')
+    if sort not in ('updated_at', 'title'):
+        raise ValueError('Invalid sort field')
+    limit = min(max(args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    
+    query = Entry.query
+    category_id = args.get('category_id', type=int)
+    if category_id is not None:
+        query = query.filter(Entry.category_id == category_id)
+    if args.get('favorite') in ('1', 'true'):
+        query = query.filter(Entry.is_favorite.is_(True))
+    
+    first_page = not args.get('cursor')
+    total = query.count() if first_page else None
+    
+    if not first_page:
+        value, last_id = decode_cursor(args['cursor'])
+        if sort == 'title':
+            query = query.filter(db.or_(
+                Entry.title > value,
+                db.and_(Entry.title == value, Entry.id > last_id)
+            ))
+        else:
+            value = datetime.fromisoformat(value)
+            query = query.filter(db.or_(
+                Entry.updated_at < value,
+                db.and_(Entry.updated_at == value, Entry.id < last_id)
+            ))
+    
+    if sort == 'title':
+        query = query.order_by(Entry.title.asc(), Entry.id.asc())
+    else:
+        query = query.order_by(Entry.updated_at.desc(), Entry.id.desc())
+    
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    page = {
+        'entries': [entry_metadata(entry) for entry in rows],
+        'next_cursor': encode_cursor(sort, rows[-1]) if has_more else None
+    }
+    if first_page:
+        page['total'] = total
+        page['counts'] = entry_counts()
+    return page
+
+def entry_counts():
+    return {
+        'all': Entry.query.count(),
+        'favorites': Entry.query.filter(Entry.is_favorite.is_(True)).count()
+    }
+
+def entry_changes(since_token, state):
+    since = delta_sync.parse_sync_token(since_token)
+    changed, deleted = delta_sync.changes_since(since, state)
+    token = delta_sync.sync_token(state)
+    if changed is None:
+        return {'reset': True, 'sync_token': token}
+    return {
+        'entries': [entry_metadata(entry) for entry in changed],
+        'deleted': deleted,
+        'sync_token': token,
+        'counts': entry_counts()
+    }
+
 @api_bp.route('/entries', methods=['GET'])
 @login_required
 def get_entries():
+    state = delta_sync.vault_state()
+    etag = delta_sync.vault_etag(state, request.query_string.decode())
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            response = jsonify(list_entries_payload(request.args, state))
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
+def list_entries_payload(args, state):
+    if 'since' in args:
+        return entry_changes(args['since'], state)
+    if 'limit' in args or 'cursor' in args:
+        page = list_entries_page(args)
+        if not args.get('cursor'):
+            page['sync_token'] = delta_sync.sync_token(state)
+        return page
+    
     entries = Entry.query.all()
     result = []
     
-    for entry in entries:
-        try:
-            decrypted_password = encryption_service.decrypt_data(entry.password)
-            decrypted_notes = encryption_service.decrypt_data(entry.notes) if entry.notes else ''
-            
-            result.append({
-                'id': entry.id,
-                'title': entry.title,
-                'username': entry.username,
-                'password': decrypted_password,
-                'url': entry.url,
-                'notes': decrypted_notes,
-                'category_id': entry.category_id,
-                'is_favorite': entry.is_favorite,
-                'created_at': entry.created_at.isoformat(),
-                'updated_at': entry.updated_at.isoformat(),
-                'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
-            })
-        except Exception as e:
-            continue
+    for entry, decrypted_password, decrypted_notes in decrypt_entries(entries):
+        result.append({
+            'id': entry.id,
+            'title': entry.title,
+            'username': entry.username,
+            'password': decrypted_password,
+            'url': entry.url,
+            'notes': decrypted_notes,
+            'category_id': entry.category_id,
+            'is_favorite': entry.is_favorite,
+            'created_at': entry.created_at.isoformat(),
+            'updated_at': entry.updated_at.isoformat(),
+            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
+        })
     
-    return jsonify(result)
+    return result
 
 @api_bp.route('/entries', methods=['POST'])
 @login_required
@@ -137,18 +372,17 @@ def create_entry():
     data = request.get_json()
     
     try:
-        encrypted_password = encryption_service.encrypt_data(data['password'])
-        encrypted_notes = encryption_service.encrypt_data(data.get('notes', ''))
-        
         entry = Entry(
             title=data['title'],
             username=data.get('username', ''),
-            password=encrypted_password,
+            password=b'',
+            password_fingerprint=fingerprints.fingerprint(data['password']),
             url=data.get('url', ''),
-            notes=encrypted_notes,
+            notes=b'',
             category_id=data.get('category_id'),
             is_favorite=data.get('is_favorite', False)
         )
+        blind_index.index_notes(entry, data.get('notes', ''))
         
         if 'tags' in data:
             for tag_name in data['tags']:
@@ -159,7 +393,11 @@ def create_entry():
                 entry.tags.append(tag)
         
         db.session.add(entry)
+        db.session.flush()
+        entry.password = encryption_service.encrypt_data(data['password'], entry_aad(entry.id, 'password'))
+        entry.notes = encryption_service.encrypt_data(data.get('notes', ''), entry_aad(entry.id, 'notes'))
         db.session.commit()
+        search_index.add_entry(entry)
         
         return jsonify({
             'id': entry.id,
@@ -172,7 +410,8 @@ def create_entry():
             'is_favorite': entry.is_favorite,
             'created_at': entry.created_at.isoformat(),
             'updated_at': entry.updated_at.isoformat(),
-            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
+            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags],
+            'breached': breach_checker.check(data['password'])
         }), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -183,8 +422,8 @@ def get_entry(entry_id):
     entry = Entry.query.get_or_404(entry_id)
     
     try:
-        decrypted_password = encryption_service.decrypt_data(entry.password)
-        decrypted_notes = encryption_service.decrypt_data(entry.notes) if entry.notes else ''
+        decrypted_password = encryption_service.decrypt_data(entry.password, entry_aad(entry.id, 'password'))
+        decrypted_notes = encryption_service.decrypt_data(entry.notes, entry_aad(entry.id, 'notes'))
         
         return jsonify({
             'id': entry.id,
@@ -202,6 +441,56 @@ def get_entry(entry_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api_bp.route('/entries/<int:entry_id>/secret', methods=['GET'])
+@login_required
+def reveal_entry_secret(entry_id):
+    entry = Entry.query.get_or_404(entry_id)
+    
+    try:
+        return jsonify({
+            'id': entry.id,
+            'password': encryption_service.decrypt_data(entry.password, entry_aad(entry.id, 'password')),
+            'notes': encryption_service.decrypt_data(entry.notes, entry_aad(entry.id, 'notes'))
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def apply_entry_changes(entry, data):
+    if 'title' in data:
+        entry.title = data['title']
+    if 'username' in data:
+        entry.username = data['username']
+    if 'password' in data:
+        entry.password = encryption_service.encrypt_data(data['password'], entry_aad(entry.id, 'password'))
+        entry.password_fingerprint = fingerprints.fingerprint(data['password'])
+    if 'url' in data:
+        entry.url = data['url']
+    if 'notes' in data:
+        entry.notes = encryption_service.encrypt_data(data['notes'], entry_aad(entry.id, 'notes'))
+        blind_index.index_notes(entry, data['notes'])
+    if 'category_id' in data:
+        entry.category_id = data['category_id']
+    if 'is_favorite' in data:
+        entry.is_favorite = data['is_favorite']
+    
+    if 'tags' in data:
+        entry.tags.clear()
+        for tag_name in data['tags']:
+            tag = Tag.query.filter_by(name=tag_name).first()
+            if not tag:
+                tag = Tag(name=tag_name)
+                db.session.add(tag)
+            entry.tags.append(tag)
+
+def update_with_history(entry, data):
+    old_password = encryption_service.decrypt_data(entry.password, entry_aad(entry.id, 'password'))
+    old_notes = encryption_service.decrypt_data(entry.notes, entry_aad(entry.id, 'notes'))
+    old_state = history.entry_state(entry, old_password, old_notes)
+    apply_entry_changes(entry, data)
+    new_state = history.entry_state(entry, data.get('password', old_password), data.get('notes', old_notes))
+    history.record(entry, old_state, new_state)
+    entry.updated_at = datetime.utcnow()
+
 @api_bp.route('/entries/<int:entry_id>', methods=['PUT'])
 @login_required
 def update_entry(entry_id):
@@ -209,34 +498,12 @@ def update_entry(entry_id):
     data = request.get_json()
     
     try:
-        if 'title' in data:
-            entry.title = data['title']
-        if 'username' in data:
-            entry.username = data['username']
-        if 'password' in data:
-            entry.password = encryption_service.encrypt_data(data['password'])
-        if 'url' in data:
-            entry.url = data['url']
-        if 'notes' in data:
-            entry.notes = encryption_service.encrypt_data(data['notes'])
-        if 'category_id' in data:
-            entry.category_id = data['category_id']
-        if 'is_favorite' in data:
-            entry.is_favorite = data['is_favorite']
-        
-        if 'tags' in data:
-            entry.tags.clear()
-            for tag_name in data['tags']:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.session.add(tag)
-                entry.tags.append(tag)
-        
+        update_with_history(entry, data)
         db.session.commit()
+        search_index.update_entry(entry)
         
-        decrypted_password = encryption_service.decrypt_data(entry.password)
-        decrypted_notes = encryption_service.decrypt_data(entry.notes) if entry.notes else ''
+        decrypted_password = encryption_service.decrypt_data(entry.password, entry_aad(entry.id, 'password'))
+        decrypted_notes = encryption_service.decrypt_data(entry.notes, entry_aad(entry.id, 'notes'))
         
         return jsonify({
             'id': entry.id,
@@ -249,7 +516,8 @@ def update_entry(entry_id):
             'is_favorite': entry.is_favorite,
             'created_at': entry.created_at.isoformat(),
             'updated_at': entry.updated_at.isoformat(),
-            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
+            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags],
+            'breached': breach_checker.check(decrypted_password) if 'password' in data else None
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -260,7 +528,125 @@ def delete_entry(entry_id):
     entry = Entry.query.get_or_404(entry_id)
     
     try:
+        attachments.delete_for_entries([entry_id])
+        history.delete_for_entries([entry_id])
         db.session.delete(entry)
+        delta_sync.record_deletions([entry_id])
+        db.session.commit()
+        search_index.remove_entry(entry_id)
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/entries/<int:entry_id>/history', methods=['GET'])
+@login_required
+def get_entry_history(entry_id):
+    Entry.query.get_or_404(entry_id)
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return jsonify(history.page(entry_id, limit, request.args.get('before', type=int)))
+
+@api_bp.route('/entries/<int:entry_id>/history/<int:revision>', methods=['GET'])
+@login_required
+def get_entry_revision(entry_id, revision):
+    row = EntryRevision.query.filter_by(entry_id=entry_id, revision=revision).first_or_404()
+    
+    try:
+        state = history.reconstruct(entry_id, revision)
+        return jsonify(dict(state, revision=row.revision, created_at=row.created_at.isoformat(),
+                            changed_fields=row.changed_fields.split(',') if row.changed_fields else []))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/entries/<int:entry_id>/history/<int:revision>/restore', methods=['POST'])
+@login_required
+def restore_entry_revision(entry_id, revision):
+    entry = Entry.query.get_or_404(entry_id)
+    EntryRevision.query.filter_by(entry_id=entry_id, revision=revision).first_or_404()
+    
+    try:
+        state = history.reconstruct(entry_id, revision)
+        if state['category_id'] is not None and db.session.get(Category, state['category_id']) is None:
+            state['category_id'] = None
+        update_with_history(entry, state)
+        db.session.commit()
+        search_index.update_entry(entry)
+        return jsonify({'success': True, 'id': entry.id, 'restored_revision': revision})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/entries/<int:entry_id>/attachments', methods=['GET'])
+@login_required
+def get_attachments(entry_id):
+    Entry.query.get_or_404(entry_id)
+    return jsonify(attachments.list_for_entry(entry_id))
+
+@api_bp.route('/entries/<int:entry_id>/attachments', methods=['POST'])
+@login_required
+def upload_attachment(entry_id):
+    Entry.query.get_or_404(entry_id)
+    name = request.args.get('name', '').strip()
+    if not name:
+        return jsonify({'error': 'Attachment name required'}), 400
+    
+    max_bytes = current_app.config['ATTACHMENT_MAX_BYTES']
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({'error': f'Attachments are limited to {max_bytes} bytes'}), 413
+    
+    try:
+        attachment = attachments.store(entry_id, name, request.mimetype, request.stream, max_bytes)
+        return jsonify(attachments.metadata(attachment, name)), 201
+    except attachments.AttachmentTooLargeError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/attachments/<int:attachment_id>', methods=['GET'])
+@login_required
+def download_attachment(attachment_id):
+    attachment = Attachment.query.get_or_404(attachment_id)
+    etag = f'attachment-{attachment.id}-{attachment.size}-{int(attachment.created_at.timestamp())}'
+    start, stop = 0, attachment.size
+    status = 200
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-store',
+        'Content-Disposition': attachments.content_disposition(
+            encryption_service.decrypt_data(attachment.name, attachment_aad(attachment.id, 'name')))
+    }
+    
+    byte_range = request.range
+    if_range = request.if_range
+    if if_range.etag or if_range.date:
+        if if_range.etag is None or if_range.etag != etag:
+            byte_range = None
+    if byte_range is not None and byte_range.units == 'bytes' and len(byte_range.ranges) == 1:
+        bounds = byte_range.range_for_length(attachment.size)
+        if bounds is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{attachment.size}'})
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{attachment.size}'
+    
+    headers['Content-Length'] = str(stop - start)
+    response = Response(
+        stream_with_context(attachments.iter_content(attachment, start, stop)),
+        status=status,
+        mimetype=attachment.content_type,
+        headers=headers
+    )
+    response.set_etag(etag)
+    return response
+
+@api_bp.route('/attachments/<int:attachment_id>', methods=['DELETE'])
+@login_required
+def delete_attachment(attachment_id):
+    Attachment.query.get_or_404(attachment_id)
+    
+    try:
+        attachments.delete([attachment_id])
         db.session.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -269,14 +655,17 @@ def delete_entry(entry_id):
 @api_bp.route('/categories', methods=['GET'])
 @login_required
 def get_categories():
-    categories = Category.query.all()
+    rows = (db.session.query(Category, db.func.count(Entry.id))
+            .outerjoin(Entry, Entry.category_id == Category.id)
+            .group_by(Category.id)
+            .order_by(Category.id))
     return jsonify([{
         'id': cat.id,
         'name': cat.name,
         'icon': cat.icon,
         'color': cat.color,
-        'count': len(cat.entries)
-    } for cat in categories])
+        'count': count
+    } for cat, count in rows])
 
 @api_bp.route('/categories', methods=['POST'])
 @login_required
@@ -323,7 +712,7 @@ def update_category(category_id):
             'name': category.name,
             'icon': category.icon,
             'color': category.color,
-            'count': len(category.entries)
+            'count': Entry.query.filter(Entry.category_id == category.id).count()
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -334,8 +723,15 @@ def delete_category(category_id):
     category = Category.query.get_or_404(category_id)
     
     try:
+        entry_ids = [entry_id for (entry_id,) in
+                     db.session.query(Entry.id).filter(Entry.category_id == category_id)]
+        attachments.delete_for_entries(entry_ids)
+        history.delete_for_entries(entry_ids)
         db.session.delete(category)
+        delta_sync.record_deletions(entry_ids)
         db.session.commit()
+        for entry_id in entry_ids:
+            search_index.remove_entry(entry_id)
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -343,12 +739,15 @@ def delete_category(category_id):
 @api_bp.route('/tags', methods=['GET'])
 @login_required
 def get_tags():
-    tags = Tag.query.all()
+    rows = (db.session.query(Tag, db.func.count(entry_tags.c.entry_id))
+            .outerjoin(entry_tags, entry_tags.c.tag_id == Tag.id)
+            .group_by(Tag.id)
+            .order_by(Tag.id))
     return jsonify([{
         'id': tag.id,
         'name': tag.name,
-        'count': len(tag.entries)
-    } for tag in tags])
+        'count': count
+    } for tag, count in rows])
 
 @api_bp.route('/tags', methods=['POST'])
 @login_required
@@ -371,69 +770,132 @@ def create_tag():
 @api_bp.route('/generate-password', methods=['POST'])
 @login_required
 def generate_password():
-    data = request.get_json()
+    data = request.get_json() or {}
+    count = data.get('count', 1)
     
-    length = data.get('length', 16)
-    use_uppercase = data.get('use_uppercase', True)
-    use_lowercase = data.get('use_lowercase', True)
-    use_digits = data.get('use_digits', True)
-    use_symbols = data.get('use_symbols', True)
-    
-    password = password_generator.generate(
-        length=length,
-        use_uppercase=use_uppercase,
-        use_lowercase=use_lowercase,
-        use_digits=use_digits,
-        use_symbols=use_symbols
-    )
+    try:
+        if data.get('mode') == 'passphrase':
+            passwords = password_generator.generate_passphrases(
+                count=count,
+                words=data.get('words', 6),
+                separator=data.get('separator', '-'),
+                capitalize=data.get('capitalize', False),
+                include_number=data.get('include_number', False)
+            )
+        else:
+            passwords = password_generator.generate_many(
+                count=count,
+                length=data.get('length', 16),
+                use_uppercase=data.get('use_uppercase', True),
+                use_lowercase=data.get('use_lowercase', True),
+                use_digits=data.get('use_digits', True),
+                use_symbols=data.get('use_symbols', True),
+                minimums={
+                    'uppercase': data.get('min_uppercase'),
+                    'lowercase': data.get('min_lowercase'),
+                    'digits': data.get('min_digits'),
+                    'symbols': data.get('min_symbols')
+                },
+                exclude=data.get('exclude', ''),
+                exclude_ambiguous=data.get('exclude_ambiguous', False)
+            )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     
-    strength = password_generator.calculate_strength(password)
+    # Scoring costs about a millisecond per password, so only the first is scored unless asked
+    score_all = request.args.get('score', 0, type=int)
+    candidates = [{'password': password} for password in passwords]
+    for candidate in candidates if score_all else candidates[:1]:
+        candidate['strength'] = strength.calculate_strength(candidate['password'])
     
     return jsonify({
-        'password': password,
-        'strength': strength
+        'password': candidates[0]['password'],
+        'strength': candidates[0]['strength'],
+        'passwords': candidates
     })
 
+@api_bp.route('/password-strength', methods=['POST'])
+def password_strength():
+    # The setup page scores the master password before any account exists
+    if is_setup_complete() and not current_user.is_authenticated:
+        return current_app.login_manager.unauthorized()
+    
+    data = request.get_json(silent=True)
+    password = data.get('password', '') if isinstance(data, dict) else None
+    if not isinstance(password, str):
+        return jsonify({'error': 'password must be a string'}), 400
+    
+    return jsonify(strength.estimate(password))
+
+@api_bp.route('/audit/strength', methods=['GET'])
+@login_required
+def audit_strength():
+    weak_score = request.args.get('weak_score', audit.WEAK_SCORE, type=int)
+    
+    try:
+        return jsonify(audit.strength_report(weak_score))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/audit/reused', methods=['GET'])
+@login_required
+def audit_reused():
+    groups = fingerprints.reused_passwords()
+    return jsonify({
+        'groups': groups,
+        'reused_entries': sum(len(group) for group in groups)
+    })
+
+@api_bp.route('/audit/breaches', methods=['GET'])
+@login_required
+def audit_breaches():
+    report = audit.breach_report()
+    if report is None:
+        return jsonify({'error': 'Breach corpus not installed'}), 404
+    return jsonify(report)
+
 @api_bp.route('/search', methods=['GET'])
 @login_required
 def search_entries():
     query = request.args.get('q', '').lower()
+    limit = request.args.get('limit', type=int)
     
     if not query:
         return jsonify([])
     
-    entries = Entry.query.all()
+    search_index.ensure_built()
+    ranked_ids = search_index.search(query)
+    seen = set(ranked_ids)
+    ranked_ids += [entry_id for entry_id in blind_index.search(query) if entry_id not in seen]
+    if limit:
+        ranked_ids = ranked_ids[:limit]
+    matches = fetch_entries_by_ids(ranked_ids)
     results = []
     
-    for entry in entries:
-        if (query in entry.title.lower() or 
-            (entry.username and query in entry.username.lower()) or 
-            (entry.url and query in entry.url.lower())):
-            try:
-                decrypted_password = encryption_service.decrypt_data(entry.password)
-                decrypted_notes = encryption_service.decrypt_data(entry.notes) if entry.notes else ''
-                
-                results.append({
-                    'id': entry.id,
-                    'title': entry.title,
-                    'username': entry.username,
-                    'password': decrypted_password,
-                    'url': entry.url,
-                    'notes': decrypted_notes,
-                    'category_id': entry.category_id,
-                    'is_favorite': entry.is_favorite,
-                    'created_at': entry.created_at.isoformat(),
-                    'updated_at': entry.updated_at.isoformat(),
-                    'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
-                })
-            except Exception:
-                continue
+    for entry, decrypted_password, decrypted_notes in decrypt_entries(matches):
+        results.append({
+            'id': entry.id,
+            'title': entry.title,
+            'username': entry.username,
+            'password': decrypted_password,
+            'url': entry.url,
+            'notes': decrypted_notes,
+            'category_id': entry.category_id,
+            'is_favorite': entry.is_favorite,
+            'created_at': entry.created_at.isoformat(),
+            'updated_at': entry.updated_at.isoformat(),
+            'tags': [{'id': tag.id, 'name': tag.name} for tag in entry.tags]
+        })
     
     return jsonify(results)
 
 @api_bp.route('/export', methods=['GET'])
 @login_required
 def export_data():
+    if request.args.get('format') == 'ndjson':
+        return export_ndjson()
+    
     entries = Entry.query.all()
     categories = Category.query.all()
     tags = Tag.query.all()
@@ -444,23 +906,17 @@ def export_data():
         'tags': []
     }
     
-    for entry in entries:
-        try:
-            decrypted_password = encryption_service.decrypt_data(entry.password)
-            decrypted_notes = encryption_service.decrypt_data(entry.notes) if entry.notes else ''
-            
-            export['entries'].append({
-                'title': entry.title,
-                'username': entry.username,
-                'password': decrypted_password,
-                'url': entry.url,
-                'notes': decrypted_notes,
-                'category_id': entry.category_id,
-                'is_favorite': entry.is_favorite,
-                'tags': [tag.name for tag in entry.tags]
-            })
-        except Exception:
-            continue
+    for entry, decrypted_password, decrypted_notes in decrypt_entries(entries):
+        export['entries'].append({
+            'title': entry.title,
+            'username': entry.username,
+            'password': decrypted_password,
+            'url': entry.url,
+            'notes': decrypted_notes,
+            'category_id': entry.category_id,
+            'is_favorite': entry.is_favorite,
+            'tags': [tag.name for tag in entry.tags]
+        })
     
     for cat in categories:
         export['categories'].append({
@@ -476,58 +932,66 @@ def export_data():
     
     return jsonify(export)
 
+def export_ndjson():
+    compression = request.args.get('compress')
+    filename = 'vault-export.ndjson'
+    mimetype = 'application/x-ndjson'
+    
+    if compression:
+        if compression not in export_stream.COMPRESSORS:
+            return jsonify({'error': 'Unsupported compression'}), 400
+        mimetype, extension = export_stream.COMPRESSORS[compression]
+        filename += extension
+    
+    response = Response(
+        stream_with_context(export_stream.iter_export_stream(compression)),
+        mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @api_bp.route('/import', methods=['POST'])
 @login_required
 def import_data():
     data = request.get_json()
     
     try:
-        category_map = {}
-        for cat_data in data.get('categories', []):
-            existing = Category.query.filter_by(name=cat_data['name']).first()
-            if not existing:
-                category = Category(**cat_data)
-                db.session.add(category)
-                db.session.flush()
-                category_map[cat_data['name']] = category.id
-            else:
-                category_map[cat_data['name']] = existing.id
-        
-        tag_map = {}
-        for tag_data in data.get('tags', []):
-            existing = Tag.query.filter_by(name=tag_data['name']).first()
-            if not existing:
-                tag = Tag(**tag_data)
-                db.session.add(tag)
-                db.session.flush()
-                tag_map[tag_data['name']] = tag
-            else:
-                tag_map[tag_data['name']] = existing
-        
-        for entry_data in data.get('entries', []):
-            encrypted_password = encryption_service.encrypt_data(entry_data['password'])
-            encrypted_notes = encryption_service.encrypt_data(entry_data.get('notes', ''))
-            
-            entry = Entry(
-                title=entry_data['title'],
-                username=entry_data.get('username', ''),
-                password=encrypted_password,
-                url=entry_data.get('url', ''),
-                notes=encrypted_notes,
-                category_id=entry_data.get('category_id'),
-                is_favorite=entry_data.get('is_favorite', False)
-            )
-            
-            if 'tags' in entry_data:
-                for tag_name in entry_data['tags']:
-                    if tag_name in tag_map:
-                        entry.tags.append(tag_map[tag_name])
-            
-            db.session.add(entry)
-        
-        db.session.commit()
+        import_jobs.import_records(import_jobs.document_records(data), atomic=True)
         
         return jsonify({'success': True, 'message': 'Data imported successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
+
+@api_bp.route('/import/jobs', methods=['POST'])
+@login_required
+def start_import_job():
+    try:
+        job = import_jobs.start_job(
+            current_app._get_current_object(),
+            request.stream,
+            compression=request.args.get('compress')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify(job.to_dict()), 202
+
+@api_bp.route('/import/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_import_job(job_id):
+    job = import_jobs.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    return jsonify(job.to_dict())
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not current_app.config.get('METRICS_ENABLED', True):
+        return jsonify({'error': 'Metrics disabled'}), 404
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'Metrics are only available locally'}), 403
+    return metrics.metrics_response()
@@ -0,0 +1,169 @@
+from urllib.parse import urlsplit
+from models import db, Entry, Tag, entry_tags
+import threading
+
+MAX_GRAM = 3
+
+FIELD_WEIGHTS = {
+    'title': 8,
+    'username': 4,
+    'host': 2,
+    'tags': 1
+}
+
+def url_host(url: str) -> str:
+    if not url:
+        return ''
+    url = url.strip().lower()
+    try:
+        host = urlsplit(url if '//' in url else '//' + url).hostname
+    except ValueError:
+        host = None
+    return host or url
+
+def index_rows():
+    tag_names = {}
+    tag_rows = db.session.query(entry_tags.c.entry_id, Tag.name).join(
+        Tag, Tag.id == entry_tags.c.tag_id)
+    for entry_id, name in tag_rows:
+        tag_names.setdefault(entry_id, []).append(name)
+    
+    entry_rows = db.session.query(Entry.id, Entry.title, Entry.username, Entry.url)
+    for entry_id, title, username, url in entry_rows:
+        yield entry_id, title, username, url, tag_names.get(entry_id, [])
+
+def grams(text: str) -> set:
+    result = set()
+    for size in range(1, MAX_GRAM + 1):
+        for i in range(len(text) - size + 1):
+            result.add(text[i:i + size])
+    return result
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = {}
+        self.documents = {}
+        self.built = False
+    
+    def _fields(self, title, username, url, tag_names):
+        return {
+            'title': (title or '').lower(),
+            'username': (username or '').lower(),
+            'host': url_host(url),
+            'tags': [name.lower() for name in tag_names]
+        }
+    
+    def _doc_grams(self, fields) -> set:
+        result = set()
+        for key in ('title', 'username', 'host'):
+            result |= grams(fields[key])
+        for name in fields['tags']:
+            result |= grams(name)
+        return result
+    
+    def _add(self, entry_id, fields):
+        self._remove(entry_id)
+        doc_grams = self._doc_grams(fields)
+        self.documents[entry_id] = (fields, doc_grams)
+        for gram in doc_grams:
+            self.postings.setdefault(gram, set()).add(entry_id)
+    
+    def _remove(self, entry_id):
+        doc = self.documents.pop(entry_id, None)
+        if doc is None:
+            return
+        for gram in doc[1]:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.postings[gram]
+    
+    def build(self, rows):
+        with self.lock:
+            self.postings = {}
+            self.documents = {}
+            for entry_id, title, username, url, tag_names in rows:
+                self._add(entry_id, self._fields(title, username, url, tag_names))
+            self.built = True
+    
+    def rebuild(self):
+        self.build(index_rows())
+    
+    def ensure_built(self):
+        if not self.built:
+            self.rebuild()
+    
+    def add_document(self, entry_id, title, username, url, tag_names):
+        with self.lock:
+            if not self.built:
+                return
+            self._add(entry_id, self._fields(title, username, url, tag_names))
+    
+    def add_entry(self, entry):
+        self.add_document(entry.id, entry.title, entry.username, entry.url,
+                          [tag.name for tag in entry.tags])
+    
+    def update_entry(self, entry):
+        self.add_entry(entry)
+    
+    def remove_entry(self, entry_id):
+        with self.lock:
+            self._remove(entry_id)
+    
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.documents = {}
+            self.built = False
+    
+    def _score(self, fields, query) -> int:
+        score = 0
+        for key in ('title', 'username', 'host'):
+            text = fields[key]
+            position = text.find(query)
+            if position < 0:
+                continue
+            weight = FIELD_WEIGHTS[key]
+            if text == query:
+                score += weight * 4
+            elif position == 0:
+                score += weight * 2
+            else:
+                score += weight
+        for name in fields['tags']:
+            if query in name:
+                score += FIELD_WEIGHTS['tags'] * (2 if name == query else 1)
+        return score
+    
+    def search(self, query: str, limit: int = None) -> list:
+        query = query.strip().lower()
+        if not query:
+            return []
+        
+        with self.lock:
+            if len(query) <= MAX_GRAM:
+                candidates = self.postings.get(query, set())
+            else:
+                query_grams = {query[i:i + MAX_GRAM] for i in range(len(query) - MAX_GRAM + 1)}
+                posting_lists = sorted(
+                    (self.postings.get(gram, set()) for gram in query_grams), key=len)
+                candidates = set(posting_lists[0])
+                for ids in posting_lists[1:]:
+                    candidates &= ids
+                    if not candidates:
+                        break
+            
+            scored = []
+            for entry_id in candidates:
+                fields = self.documents[entry_id][0]
+                score = self._score(fields, query)
+                if score:
+                    scored.append((-score, fields['title'], entry_id))
+        
+        scored.sort()
+        ids = [entry_id for _, _, entry_id in scored]
+        return ids[:limit] if limit else ids
+
+search_index = SearchIndex()
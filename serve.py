@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer
+from app import create_app
+from config import Config
+import backup
+import argparse
+
+try:
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
+
+class PooledWSGIServer(BaseWSGIServer):
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+    
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+def run(host, port, threads):
+    app = create_app()
+    backup.start_scheduler(app)
+    
+    print(f"密码管理器服务已启动: http://{host}:{port} ({threads} 个工作线程)")
+    
+    if waitress_serve:
+        waitress_serve(app, host=host, port=port, threads=threads)
+        return
+    
+    server = PooledWSGIServer(host, port, app, threads)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the password manager with a threaded WSGI server')
+    parser.add_argument('--host', default=Config.SERVE_HOST)
+    parser.add_argument('--port', type=int, default=Config.SERVE_PORT)
+    parser.add_argument('--threads', type=int, default=Config.SERVE_THREADS)
+    args = parser.parse_args()
+    
+    run(args.host, args.port, args.threads)
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,30 @@ let categories = [];
 let currentFilter = 'all';
 let currentCategoryFilter = null;
 let selectedEntry = null;
+let nextCursor = null;
+let pageRequest = null;
+let entriesGeneration = 0;
+let syncToken = null;
+let syncEtag = null;
+let strengthTimer = null;
+let strengthRequestId = 0;
+let searchQuery = '';
+let searchTimer = null;
+let visibleEntries = [];
+let renderScheduled = false;
+let rowHeight = 0;
+let gridPadding = 0;
+let categoriesVersion = 0;
+
+const PAGE_SIZE = 50;
+const METADATA_PAGE_SIZE = 200;
+const STRENGTH_DEBOUNCE_MS = 250;
+const SEARCH_DEBOUNCE_MS = 150;
+const OVERSCAN_ROWS = 3;
+const SEARCH_WEIGHTS = { title: 8, username: 4, host: 2, tags: 1 };
+
+const cardNodes = new Map();
+const searchFields = new WeakMap();
 
 document.addEventListener('DOMContentLoaded', function () {
     initializeApp();
@@ -34,12 +58,26 @@ function setupEventListeners() {
         generatePassword();
     });
 
-    ['useUppercase', 'useLowercase', 'useDigits', 'useSymbols'].forEach(id => {
+    ['useUppercase', 'useLowercase', 'useDigits', 'useSymbols', 'excludeAmbiguous', 'usePassphrase'].forEach(id => {
         document.getElementById(id).addEventListener('change', generatePassword);
     });
 
     document.getElementById('searchInput').addEventListener('input', handleSearch);
 
+    const entriesGrid = document.getElementById('entriesGrid');
+    entriesGrid.addEventListener('click', handleGridClick);
+    entriesGrid.addEventListener('scroll', function () {
+        scheduleRender();
+        if (!searchQuery && this.scrollTop + this.clientHeight >= this.scrollHeight - 200) {
+            loadMoreEntries();
+        }
+    }, { passive: true });
+
+    window.addEventListener('resize', function () {
+        rowHeight = 0;
+        scheduleRender();
+    });
+
     document.getElementById('lockBtn').addEventListener('click', lockVault);
 
     document.getElementById('closeDetailBtn').addEventListener('click', closeDetailPanel);
@@ -78,7 +116,8 @@ function setupEventListeners() {
             this.classList.add('active');
             currentFilter = this.dataset.filter;
             currentCategoryFilter = null;
-            renderEntries();
+            clearSearch();
+            loadEntries();
         });
     });
 
@@ -139,23 +178,145 @@ async function loadCategories() {
     try {
         const response = await fetch('/api/categories');
         categories = await response.json();
+        categoriesVersion++;
         renderCategories();
     } catch (error) {
         showToast('加载分类失败', 'error');
     }
 }
 
+function buildEntriesQuery(cursor, limit = PAGE_SIZE) {
+    const params = new URLSearchParams({ limit });
+    if (currentFilter === 'favorites') {
+        params.set('favorite', '1');
+    } else if (currentFilter === 'category' && currentCategoryFilter) {
+        params.set('category_id', currentCategoryFilter);
+    }
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    return `/api/entries?${params.toString()}`;
+}
+
 async function loadEntries() {
+    const generation = ++entriesGeneration;
     try {
-        const response = await fetch('/api/entries');
-        entries = await response.json();
+        const response = await fetch(buildEntriesQuery(null));
+        const page = await response.json();
+        if (generation !== entriesGeneration) {
+            return;
+        }
+        entries = page.entries;
+        nextCursor = page.next_cursor;
+        syncToken = page.sync_token;
+        syncEtag = null;
         renderEntries();
-        updateCounts();
+        updateCounts(page.counts);
     } catch (error) {
         showToast('加载密码条目失败', 'error');
     }
 }
 
+function loadMoreEntries(limit = PAGE_SIZE) {
+    if (!nextCursor) {
+        return Promise.resolve(false);
+    }
+    if (!pageRequest) {
+        pageRequest = fetchNextPage(limit).finally(() => {
+            pageRequest = null;
+        });
+    }
+    return pageRequest;
+}
+
+async function fetchNextPage(limit) {
+    const generation = entriesGeneration;
+    try {
+        const response = await fetch(buildEntriesQuery(nextCursor, limit));
+        const page = await response.json();
+        if (generation !== entriesGeneration) {
+            return false;
+        }
+        entries.push(...page.entries);
+        nextCursor = page.next_cursor;
+        renderEntries();
+        return true;
+    } catch (error) {
+        showToast('加载密码条目失败', 'error');
+        return false;
+    }
+}
+
+async function loadAllEntries() {
+    const generation = entriesGeneration;
+    while (nextCursor && generation === entriesGeneration) {
+        if (!await loadMoreEntries(METADATA_PAGE_SIZE)) {
+            return;
+        }
+    }
+}
+
+function matchesCurrentFilter(entry) {
+    if (currentFilter === 'favorites') {
+        return entry.is_favorite;
+    }
+    if (currentFilter === 'category' && currentCategoryFilter) {
+        return entry.category_id === currentCategoryFilter;
+    }
+    return true;
+}
+
+async function syncEntries() {
+    if (!syncToken) {
+        await loadEntries();
+        return;
+    }
+
+    try {
+        const headers = syncEtag ? { 'If-None-Match': syncEtag } : {};
+        const response = await fetch(`/api/entries?since=${encodeURIComponent(syncToken)}`, {
+            headers,
+            cache: 'no-store'
+        });
+        if (response.status === 304) {
+            return;
+        }
+
+        const changes = await response.json();
+        if (!response.ok || changes.reset) {
+            await loadEntries();
+            return;
+        }
+
+        const deleted = new Set(changes.deleted);
+        const changed = new Map(changes.entries.map(entry => [entry.id, entry]));
+
+        entries = entries
+            .filter(entry => !deleted.has(entry.id) || changed.has(entry.id))
+            .map(entry => changed.has(entry.id) ? { ...entry, ...changed.get(entry.id) } : entry)
+            .filter(matchesCurrentFilter);
+
+        const known = new Set(entries.map(entry => entry.id));
+        const added = changes.entries.filter(entry => !known.has(entry.id) && matchesCurrentFilter(entry));
+        entries = added.concat(entries);
+
+        syncToken = changes.sync_token;
+        syncEtag = response.headers.get('ETag');
+        renderEntries();
+        updateCounts(changes.counts);
+    } catch (error) {
+        showToast('加载密码条目失败', 'error');
+    }
+}
+
+async function fetchEntryDetails(entryId) {
+    const response = await fetch(`/api/entries/${entryId}`);
+    if (!response.ok) {
+        throw new Error('Failed to load entry');
+    }
+    return await response.json();
+}
+
 function renderCategories() {
     const categoriesList = document.getElementById('categoriesList');
     const categorySelect = document.getElementById('entryCategory');
@@ -197,7 +358,8 @@ function renderCategories() {
                 this.classList.add('active');
                 currentFilter = 'category';
                 currentCategoryFilter = parseInt(this.dataset.categoryId);
-                renderEntries();
+                clearSearch();
+                loadEntries();
             }
         });
 
@@ -223,72 +385,151 @@ function renderCategories() {
 }
 
 function renderEntries() {
-    const grid = document.getElementById('entriesGrid');
-
-    let filteredEntries = entries;
+    visibleEntries = searchQuery ? searchEntries(searchQuery) : entries.filter(matchesCurrentFilter);
+    renderWindow();
+}
 
-    if (currentFilter === 'favorites') {
-        filteredEntries = entries.filter(e => e.is_favorite);
-    } else if (currentFilter === 'category' && currentCategoryFilter) {
-        filteredEntries = entries.filter(e => e.category_id === currentCategoryFilter);
+function scheduleRender() {
+    if (!renderScheduled) {
+        renderScheduled = true;
+        requestAnimationFrame(renderWindow);
     }
+}
+
+function gridColumnCount(grid) {
+    const columns = getComputedStyle(grid).gridTemplateColumns.split(' ').filter(Boolean).length;
+    return Math.max(columns, 1);
+}
+
+function measureGrid(grid) {
+    grid.style.paddingTop = '';
+    grid.style.paddingBottom = '';
+    grid.style.gridAutoRows = '';
+    gridPadding = parseFloat(getComputedStyle(grid).paddingTop) || 0;
+
+    const probe = createCardNode({
+        id: 0,
+        title: 'W',
+        username: 'W',
+        url: 'W',
+        category_id: categories.length ? categories[0].id : null,
+        is_favorite: false
+    });
+    grid.appendChild(probe);
+    rowHeight = probe.offsetHeight;
+    probe.remove();
+    grid.style.gridAutoRows = `${rowHeight}px`;
+}
+
+function renderWindow() {
+    renderScheduled = false;
+    const grid = document.getElementById('entriesGrid');
 
-    if (filteredEntries.length === 0) {
+    if (visibleEntries.length === 0) {
+        cardNodes.clear();
+        grid.style.paddingTop = '';
+        grid.style.paddingBottom = '';
         grid.innerHTML = `
             <div style="grid-column: 1 / -1;" class="empty-state">
                 <svg width="64" height="64" viewBox="0 0 24 24" fill="none" stroke="currentColor">
                     <rect x="3" y="11" width="18" height="11" rx="2" ry="2"/>
                     <path d="M7 11V7a5 5 0 0 1 10 0v4"/>
                 </svg>
-                <p>暂无密码条目</p>
+                <p>${searchQuery ? '未找到匹配的密码条目' : '暂无密码条目'}</p>
             </div>
         `;
         return;
     }
 
-    grid.innerHTML = filteredEntries.map(entry => createEntryCard(entry)).join('');
+    if (cardNodes.size === 0) {
+        grid.innerHTML = '';
+    }
+    if (!rowHeight) {
+        measureGrid(grid);
+    }
+
+    const columns = gridColumnCount(grid);
+    const stride = rowHeight + (parseFloat(getComputedStyle(grid).rowGap) || 0);
+    const totalRows = Math.ceil(visibleEntries.length / columns);
+    const scrollTop = Math.max(grid.scrollTop - gridPadding, 0);
+    const firstRow = Math.min(Math.max(Math.floor(scrollTop / stride) - OVERSCAN_ROWS, 0), totalRows);
+    const lastRow = Math.min(Math.ceil((scrollTop + grid.clientHeight) / stride) + OVERSCAN_ROWS, totalRows);
 
-    document.querySelectorAll('.entry-card').forEach(card => {
-        card.addEventListener('click', function (e) {
-            if (!e.target.closest('.entry-actions')) {
-                const entryId = parseInt(this.dataset.entryId);
-                selectEntry(entryId);
+    grid.style.paddingTop = `${gridPadding + firstRow * stride}px`;
+    grid.style.paddingBottom = `${gridPadding + (totalRows - lastRow) * stride}px`;
+    patchCards(grid, visibleEntries.slice(firstRow * columns, lastRow * columns));
+}
+
+function cardSignature(entry) {
+    return [entry.title, entry.username, entry.url, entry.category_id, entry.is_favorite, categoriesVersion].join('\u0000');
+}
+
+function createCardNode(entry) {
+    const template = document.createElement('template');
+    template.innerHTML = createEntryCard(entry).trim();
+    return template.content.firstElementChild;
+}
+
+function patchCards(grid, windowEntries) {
+    const wanted = new Set(windowEntries.map(entry => entry.id));
+    for (const [id, node] of cardNodes) {
+        if (!wanted.has(id)) {
+            node.remove();
+            cardNodes.delete(id);
+        }
+    }
+
+    let cursor = grid.firstElementChild;
+    for (const entry of windowEntries) {
+        const signature = cardSignature(entry);
+        let node = cardNodes.get(entry.id);
+        if (!node || node.dataset.signature !== signature) {
+            const fresh = createCardNode(entry);
+            fresh.dataset.signature = signature;
+            if (node) {
+                if (cursor === node) {
+                    cursor = fresh;
+                }
+                node.replaceWith(fresh);
             }
-        });
-    });
+            node = fresh;
+            cardNodes.set(entry.id, node);
+        }
+        node.classList.toggle('selected', selectedEntry?.id === entry.id);
 
-    document.querySelectorAll('.copy-btn').forEach(btn => {
-        btn.addEventListener('click', function (e) {
-            e.stopPropagation();
-            const entryId = parseInt(this.closest('.entry-card').dataset.entryId);
-            const entry = entries.find(e => e.id === entryId);
-            copyToClipboard(entry.password);
-        });
-    });
+        if (node === cursor) {
+            cursor = cursor.nextElementSibling;
+        } else {
+            grid.insertBefore(node, cursor);
+        }
+    }
+}
 
-    document.querySelectorAll('.edit-btn').forEach(btn => {
-        btn.addEventListener('click', function (e) {
-            e.stopPropagation();
-            const entryId = parseInt(this.closest('.entry-card').dataset.entryId);
-            editEntry(entryId);
-        });
-    });
+function handleGridClick(e) {
+    const card = e.target.closest('.entry-card');
+    if (!card) {
+        return;
+    }
 
-    document.querySelectorAll('.delete-btn').forEach(btn => {
-        btn.addEventListener('click', function (e) {
-            e.stopPropagation();
-            const entryId = parseInt(this.closest('.entry-card').dataset.entryId);
-            deleteEntry(entryId);
-        });
-    });
+    const entryId = parseInt(card.dataset.entryId);
+    const button = e.target.closest('.copy-btn, .edit-btn, .delete-btn, .favorite-btn');
+    if (!button) {
+        if (!e.target.closest('.entry-actions')) {
+            selectEntry(entryId);
+        }
+        return;
+    }
 
-    document.querySelectorAll('.favorite-btn').forEach(btn => {
-        btn.addEventListener('click', function (e) {
-            e.stopPropagation();
-            const entryId = parseInt(this.closest('.entry-card').dataset.entryId);
-            toggleFavorite(entryId);
-        });
-    });
+    e.stopPropagation();
+    if (button.classList.contains('copy-btn')) {
+        copyEntryPassword(entryId);
+    } else if (button.classList.contains('edit-btn')) {
+        editEntry(entryId);
+    } else if (button.classList.contains('delete-btn')) {
+        deleteEntry(entryId);
+    } else {
+        toggleFavorite(entryId);
+    }
 }
 
 function createEntryCard(entry) {
@@ -341,10 +582,25 @@ function createEntryCard(entry) {
     `;
 }
 
-function selectEntry(entryId) {
-    selectedEntry = entries.find(e => e.id === entryId);
-    renderEntries();
-    showDetailPanel();
+async function selectEntry(entryId) {
+    try {
+        selectedEntry = await fetchEntryDetails(entryId);
+        detailPasswordVisible = false;
+        renderWindow();
+        showDetailPanel();
+    } catch (error) {
+        showToast('加载密码条目失败', 'error');
+    }
+}
+
+async function copyEntryPassword(entryId) {
+    try {
+        const response = await fetch(`/api/entries/${entryId}/secret`);
+        const secret = await response.json();
+        copyToClipboard(secret.password);
+    } catch (error) {
+        showToast('复制失败', 'error');
+    }
 }
 
 function showDetailPanel() {
@@ -464,7 +720,7 @@ function showDetailPanel() {
 
 function closeDetailPanel() {
     selectedEntry = null;
-    renderEntries();
+    renderWindow();
     showDetailPanel();
 }
 
@@ -504,9 +760,13 @@ function closeEntryModal() {
     modal.classList.remove('active');
 }
 
-function editEntry(entryId) {
-    const entry = entries.find(e => e.id === entryId);
-    openEntryModal(entry);
+async function editEntry(entryId) {
+    try {
+        const entry = await fetchEntryDetails(entryId);
+        openEntryModal(entry);
+    } catch (error) {
+        showToast('加载密码条目失败', 'error');
+    }
 }
 
 async function saveEntry(e) {
@@ -534,10 +794,15 @@ async function saveEntry(e) {
         });
 
         if (response.ok) {
-            await loadEntries();
+            const saved = await response.json();
+            await syncEntries();
             await loadCategories();
             closeEntryModal();
-            showToast(entryId ? '密码已更新' : '密码已添加', 'success');
+            if (saved.breached) {
+                showToast('已保存，但该密码出现在已泄露密码库中，建议更换', 'error');
+            } else {
+                showToast(entryId ? '密码已更新' : '密码已添加', 'success');
+            }
         } else {
             showToast('保存失败', 'error');
         }
@@ -560,7 +825,7 @@ async function deleteEntry(entryId) {
             if (selectedEntry?.id === entryId) {
                 selectedEntry = null;
             }
-            await loadEntries();
+            await syncEntries();
             await loadCategories();
             showDetailPanel();
             showToast('密码已删除', 'success');
@@ -585,9 +850,9 @@ async function toggleFavorite(entryId) {
         });
 
         if (response.ok) {
-            await loadEntries();
+            await syncEntries();
             if (selectedEntry?.id === entryId) {
-                selectedEntry = entries.find(e => e.id === entryId);
+                selectedEntry = await response.json();
                 showDetailPanel();
             }
         }
@@ -626,21 +891,35 @@ async function generatePassword() {
     const useLowercase = document.getElementById('useLowercase').checked;
     const useDigits = document.getElementById('useDigits').checked;
     const useSymbols = document.getElementById('useSymbols').checked;
+    const excludeAmbiguous = document.getElementById('excludeAmbiguous').checked;
+    const usePassphrase = document.getElementById('usePassphrase').checked;
+
+    const options = usePassphrase ? {
+        mode: 'passphrase',
+        words: Math.max(4, Math.round(length / 3)),
+        capitalize: useUppercase,
+        include_number: useDigits
+    } : {
+        length,
+        use_uppercase: useUppercase,
+        use_lowercase: useLowercase,
+        use_digits: useDigits,
+        use_symbols: useSymbols,
+        exclude_ambiguous: excludeAmbiguous
+    };
 
     try {
         const response = await fetch('/api/generate-password', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                length,
-                use_uppercase: useUppercase,
-                use_lowercase: useLowercase,
-                use_digits: useDigits,
-                use_symbols: useSymbols
-            })
+            body: JSON.stringify(options)
         });
 
         const data = await response.json();
+        if (!response.ok) {
+            showToast(data.error || '生成密码失败', 'error');
+            return;
+        }
         document.getElementById('generatedPassword').value = data.password;
     } catch (error) {
         showToast('生成密码失败', 'error');
@@ -660,8 +939,34 @@ function copyGeneratedPassword() {
 }
 
 function updatePasswordStrength(password) {
+    clearTimeout(strengthTimer);
+    if (!password) {
+        renderPasswordStrength(0);
+        return;
+    }
+    strengthTimer = setTimeout(() => estimatePasswordStrength(password), STRENGTH_DEBOUNCE_MS);
+}
+
+async function estimatePasswordStrength(password) {
+    const requestId = ++strengthRequestId;
+
+    try {
+        const response = await fetch('/api/password-strength', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ password })
+        });
+        const data = await response.json();
+        if (response.ok && requestId === strengthRequestId) {
+            renderPasswordStrength(data.score);
+        }
+    } catch (error) {
+        renderPasswordStrength(0);
+    }
+}
+
+function renderPasswordStrength(strength) {
     const strengthBars = document.querySelectorAll('#entryForm .strength-bar');
-    const strength = calculatePasswordStrength(password);
 
     strengthBars.forEach((bar, index) => {
         bar.classList.remove('active', 'weak', 'medium', 'strong');
@@ -674,46 +979,98 @@ function updatePasswordStrength(password) {
     });
 }
 
-function calculatePasswordStrength(password) {
-    if (!password) return 0;
-
-    let score = 0;
-    const length = password.length;
-
-    if (length >= 8) score += 1;
-    if (length >= 12) score += 1;
-    if (length >= 16) score += 1;
-    if (/[a-z]/.test(password)) score += 1;
-    if (/[A-Z]/.test(password)) score += 1;
-    if (/[0-9]/.test(password)) score += 1;
-    if (/[^a-zA-Z0-9]/.test(password)) score += 1;
-
-    return Math.min(Math.floor(score / 1.4), 5);
+function handleSearch(e) {
+    const value = e.target.value;
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => applySearch(value), SEARCH_DEBOUNCE_MS);
 }
 
-async function handleSearch(e) {
-    const query = e.target.value.trim();
-
-    if (query.length === 0) {
-        await loadEntries();
-        return;
-    }
-
-    if (query.length < 2) {
+async function applySearch(value) {
+    const query = value.trim().toLowerCase();
+    if (query === searchQuery) {
         return;
     }
 
-    try {
-        const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
-        entries = await response.json();
+    if (query && currentFilter !== 'all') {
         currentFilter = 'all';
         currentCategoryFilter = null;
         document.querySelectorAll('.nav-item').forEach(i => i.classList.remove('active'));
         document.querySelectorAll('.category-item').forEach(i => i.classList.remove('active'));
-        renderEntries();
+        await loadEntries();
+    }
+    if (query) {
+        await loadAllEntries();
+    }
+    if (document.getElementById('searchInput').value.trim().toLowerCase() !== query) {
+        return;
+    }
+
+    searchQuery = query;
+    document.getElementById('entriesGrid').scrollTop = 0;
+    renderEntries();
+}
+
+function clearSearch() {
+    clearTimeout(searchTimer);
+    searchQuery = '';
+    document.getElementById('searchInput').value = '';
+}
+
+function urlHost(url) {
+    try {
+        return new URL(url.includes('//') ? url : `http://${url}`).hostname || url.toLowerCase();
     } catch (error) {
-        showToast('搜索失败', 'error');
+        return url.toLowerCase();
+    }
+}
+
+function searchFieldsFor(entry) {
+    let fields = searchFields.get(entry);
+    if (!fields) {
+        fields = {
+            title: (entry.title || '').toLowerCase(),
+            username: (entry.username || '').toLowerCase(),
+            host: entry.url ? urlHost(entry.url) : '',
+            tags: (entry.tags || []).map(tag => tag.name.toLowerCase())
+        };
+        searchFields.set(entry, fields);
+    }
+    return fields;
+}
+
+function scoreEntry(fields, query) {
+    let score = 0;
+    for (const key of ['title', 'username', 'host']) {
+        const position = fields[key].indexOf(query);
+        if (position < 0) {
+            continue;
+        }
+        if (fields[key] === query) {
+            score += SEARCH_WEIGHTS[key] * 4;
+        } else if (position === 0) {
+            score += SEARCH_WEIGHTS[key] * 2;
+        } else {
+            score += SEARCH_WEIGHTS[key];
+        }
+    }
+    for (const name of fields.tags) {
+        if (name.includes(query)) {
+            score += SEARCH_WEIGHTS.tags * (name === query ? 2 : 1);
+        }
+    }
+    return score;
+}
+
+function searchEntries(query) {
+    const scored = [];
+    for (const entry of entries) {
+        const score = scoreEntry(searchFieldsFor(entry), query);
+        if (score) {
+            scored.push({ entry, score });
+        }
     }
+    scored.sort((a, b) => b.score - a.score || (a.entry.title < b.entry.title ? -1 : a.entry.title > b.entry.title ? 1 : 0));
+    return scored.map(item => item.entry);
 }
 
 async function lockVault() {
@@ -730,12 +1087,11 @@ async function lockVault() {
     }
 }
 
-function updateCounts() {
-    const allCount = entries.length;
-    const favCount = entries.filter(e => e.is_favorite).length;
+function updateCounts(counts) {
+    if (!counts) return;
 
-    document.getElementById('allCount').textContent = allCount;
-    document.getElementById('favCount').textContent = favCount;
+    document.getElementById('allCount').textContent = counts.all;
+    document.getElementById('favCount').textContent = counts.favorites;
 }
 
 function copyToClipboard(text) {
@@ -0,0 +1,104 @@
+from sqlalchemy import event, text
+from models import db, Attachment, AttachmentChunk, EntryRevision, SyncState
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+def configure_engine(app):
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+def column_exists(connection, table, column):
+    rows = connection.execute(text(f'PRAGMA table_info("{table}")'))
+    return any(row[1] == column for row in rows)
+
+def add_column(connection, table, column, ddl):
+    if not column_exists(connection, table, column):
+        connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {ddl}'))
+
+def migration_1_indexes(connection):
+    for statement in (
+        'CREATE INDEX IF NOT EXISTS ix_entry_title ON entry (title)',
+        'CREATE INDEX IF NOT EXISTS ix_entry_category_id ON entry (category_id)',
+        'CREATE INDEX IF NOT EXISTS ix_entry_is_favorite ON entry (is_favorite)',
+        'CREATE INDEX IF NOT EXISTS ix_entry_updated_at ON entry (updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_entry_tags_tag_id ON entry_tags (tag_id)',
+    ):
+        connection.execute(text(statement))
+
+def migration_2_kdf_columns(connection):
+    add_column(connection, 'config', 'kdf_version', 'kdf_version INTEGER NOT NULL DEFAULT 1')
+    add_column(connection, 'config', 'kdf_params', 'kdf_params VARCHAR(200)')
+
+def migration_3_key_rotation(connection):
+    add_column(connection, 'config', 'pending_vault_key', 'pending_vault_key BLOB')
+    add_column(connection, 'config', 'rotation_checkpoint', 'rotation_checkpoint VARCHAR(100)')
+
+def migration_4_password_fingerprints(connection):
+    add_column(connection, 'entry', 'password_fingerprint', 'password_fingerprint VARCHAR(32)')
+    add_column(connection, 'config', 'fingerprint_key_id', 'fingerprint_key_id VARCHAR(32)')
+    connection.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_entry_password_fingerprint ON entry (password_fingerprint)'))
+
+def migration_5_attachments(connection):
+    db.metadata.create_all(connection, tables=[Attachment.__table__, AttachmentChunk.__table__])
+
+def migration_6_entry_history(connection):
+    db.metadata.create_all(connection, tables=[EntryRevision.__table__])
+
+def migration_7_change_sequence(connection):
+    add_column(connection, 'entry', 'change_seq', 'change_seq INTEGER NOT NULL DEFAULT 0')
+    add_column(connection, 'tombstone', 'change_seq', 'change_seq INTEGER NOT NULL DEFAULT 0')
+    for statement in (
+        'CREATE INDEX IF NOT EXISTS ix_entry_change_seq ON entry (change_seq)',
+        'CREATE INDEX IF NOT EXISTS ix_tombstone_change_seq ON tombstone (change_seq)',
+    ):
+        connection.execute(text(statement))
+    db.metadata.create_all(connection, tables=[SyncState.__table__])
+    connection.execute(text(
+        'INSERT OR IGNORE INTO sync_state (id, change_seq, pruned_seq) VALUES (1, 0, 0)'))
+
+MIGRATIONS = [
+    (1, migration_1_indexes),
+    (2, migration_2_kdf_columns),
+    (3, migration_3_key_rotation),
+    (4, migration_4_password_fingerprints),
+    (5, migration_5_attachments),
+    (6, migration_6_entry_history),
+    (7, migration_7_change_sequence),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(connection):
+    return connection.execute(text('PRAGMA user_version')).scalar() or 0
+
+def set_schema_version(connection, version):
+    connection.execute(text(f'PRAGMA user_version={int(version)}'))
+
+def upgrade_schema():
+    with db.engine.connect() as connection:
+        if get_schema_version(connection) == SCHEMA_VERSION:
+            return
+    
+    db.create_all()
+    
+    with db.engine.begin() as connection:
+        current = get_schema_version(connection)
+        for version, migrate in MIGRATIONS:
+            if version > current:
+                migrate(connection)
+                set_schema_version(connection, version)
+        if current < SCHEMA_VERSION:
+            connection.execute(text('ANALYZE'))
@@ -0,0 +1,333 @@
+from password_generator import wordlist_path
+from datetime import datetime
+import math
+import re
+import threading
+
+DICTIONARIES = ('passwords', 'english', 'names')
+MAX_ANALYZED_LENGTH = 100
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_SINGLE_CHAR = 10
+MIN_GUESSES_MULTI_CHAR = 50
+MIN_YEAR_SPACE = 20
+REFERENCE_YEAR = datetime.utcnow().year
+SCORE_THRESHOLDS = (1e3, 1e6, 1e8, 1e10)
+
+L33T_TABLE = str.maketrans({
+    '4': 'a', '@': 'a', '8': 'b', '(': 'c', '{': 'c', '3': 'e', '6': 'g', '9': 'g',
+    '1': 'i', '!': 'i', '|': 'l', '0': 'o', '$': 's', '5': 's', '7': 't', '+': 't', '2': 'z'
+})
+
+KEYBOARD_ROWS = ('`1234567890-=', 'qwertyuiop[]\\', "asdfghjkl;'", 'zxcvbnm,./')
+SHIFTED_ROWS = ('~!@#$%^&*()_+', 'QWERTYUIOP{}|', 'ASDFGHJKL:"', 'ZXCVBNM<>?')
+
+DATE_SPLITS = {
+    4: ((1, 2), (2, 3)),
+    5: ((1, 3), (2, 3)),
+    6: ((1, 2), (2, 4), (4, 5)),
+    7: ((1, 3), (2, 3), (4, 5), (4, 6)),
+    8: ((2, 4), (4, 6))
+}
+DATE_WITH_SEPARATOR = re.compile(r'^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$')
+YEAR = re.compile(r'19\d\d|20\d\d')
+
+class Match:
+    __slots__ = ('i', 'j', 'pattern', 'guesses')
+    
+    def __init__(self, i, j, pattern, guesses):
+        self.i = i
+        self.j = j
+        self.pattern = pattern
+        min_guesses = MIN_GUESSES_SINGLE_CHAR if j - i == 1 else MIN_GUESSES_MULTI_CHAR
+        self.guesses = max(guesses, min_guesses)
+
+class Dictionaries:
+    def __init__(self):
+        self.ranked = None
+        self.prefixes = None
+        self.lock = threading.Lock()
+    
+    def load(self):
+        ranked = {}
+        for name in DICTIONARIES:
+            with open(wordlist_path(f'{name}.txt'), 'r', encoding='utf-8') as f:
+                for rank, line in enumerate(f, start=1):
+                    word = line.strip()
+                    if word and (word not in ranked or ranked[word] > rank):
+                        ranked[word] = rank
+        self.prefixes = {word[:end] for word in ranked for end in range(1, len(word))}
+        self.ranked = ranked
+    
+    def get(self):
+        if self.ranked is None:
+            with self.lock:
+                if self.ranked is None:
+                    self.load()
+        return self.ranked
+
+dictionaries = Dictionaries()
+
+def build_keyboard_graph():
+    positions = {}
+    for rows in (KEYBOARD_ROWS, SHIFTED_ROWS):
+        for row, keys in enumerate(rows):
+            for column, key in enumerate(keys):
+                positions[key] = (row, column)
+    
+    graph = {}
+    for key, (row, column) in positions.items():
+        graph[key] = {
+            (row, column - 1), (row, column + 1),
+            (row - 1, column), (row - 1, column + 1),
+            (row + 1, column - 1), (row + 1, column)
+        }
+    return positions, graph
+
+KEY_POSITIONS, KEYBOARD_GRAPH = build_keyboard_graph()
+KEYBOARD_STARTS = len(KEY_POSITIONS) // 2
+KEYBOARD_DEGREE = 4.6
+
+def uppercase_variations(token):
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    if upper == 0:
+        return 1
+    if lower == 0 or (upper == 1 and (token[0].isupper() or token[-1].isupper())):
+        return 2
+    return sum(math.comb(upper + lower, k) for k in range(1, min(upper, lower) + 1))
+
+def dictionary_matches(password, lowered, pattern, multiplier=1):
+    ranked = dictionaries.get()
+    prefixes = dictionaries.prefixes
+    length = len(lowered)
+    matches = []
+    for i in range(length):
+        for j in range(i + 1, length + 1):
+            token = lowered[i:j]
+            rank = ranked.get(token)
+            if rank is not None:
+                guesses = rank * uppercase_variations(password[i:j]) * multiplier
+                matches.append(Match(i, j, pattern, guesses))
+            if token not in prefixes:
+                break
+    return matches
+
+def reversed_matches(password, lowered):
+    length = len(password)
+    matches = dictionary_matches(password[::-1], lowered[::-1], 'reversed', multiplier=2)
+    for match in matches:
+        match.i, match.j = length - match.j, length - match.i
+    return matches
+
+def l33t_matches(password, lowered):
+    substituted = lowered.translate(L33T_TABLE)
+    if substituted == lowered:
+        return []
+    matches = []
+    for match in dictionary_matches(password, substituted, 'l33t'):
+        substitutions = sum(1 for a, b in zip(lowered[match.i:match.j], substituted[match.i:match.j]) if a != b)
+        if substitutions:
+            match.guesses *= 2 ** substitutions
+            matches.append(match)
+    return matches
+
+def spatial_guesses(length, turns, shifted):
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * KEYBOARD_STARTS * KEYBOARD_DEGREE ** j
+    if shifted:
+        unshifted = length - shifted
+        if unshifted == 0:
+            guesses *= 2
+        else:
+            guesses *= sum(math.comb(length, k) for k in range(1, min(shifted, unshifted) + 1))
+    return guesses
+
+def spatial_matches(password):
+    matches = []
+    i = 0
+    while i < len(password) - 2:
+        j = i + 1
+        turns = 0
+        direction = None
+        while j < len(password):
+            previous, current = password[j - 1], password[j]
+            if previous not in KEYBOARD_GRAPH or KEY_POSITIONS.get(current) not in KEYBOARD_GRAPH[previous]:
+                break
+            step = (KEY_POSITIONS[current][0] - KEY_POSITIONS[previous][0],
+                    KEY_POSITIONS[current][1] - KEY_POSITIONS[previous][1])
+            if step != direction:
+                turns += 1
+                direction = step
+            j += 1
+        if j - i >= 3:
+            token = password[i:j]
+            shifted = sum(1 for c in token if any(c in row for row in SHIFTED_ROWS))
+            matches.append(Match(i, j, 'spatial', spatial_guesses(j - i, turns, shifted)))
+            i = j
+        else:
+            i += 1
+    return matches
+
+def char_class(c):
+    if c.islower():
+        return 'lower'
+    if c.isupper():
+        return 'upper'
+    if c.isdigit():
+        return 'digit'
+    return None
+
+def sequence_matches(password):
+    matches = []
+    i = 0
+    while i < len(password) - 2:
+        delta = ord(password[i + 1]) - ord(password[i])
+        kind = char_class(password[i])
+        if kind is None or not 0 < abs(delta) <= 5 or char_class(password[i + 1]) != kind:
+            i += 1
+            continue
+        j = i + 2
+        while (j < len(password) and ord(password[j]) - ord(password[j - 1]) == delta
+               and char_class(password[j]) == kind):
+            j += 1
+        if j - i >= 3:
+            first = password[i]
+            if first in 'aAzZ019':
+                base = 4
+            elif kind == 'digit':
+                base = 10
+            else:
+                base = 26
+            if delta < 0:
+                base *= 2
+            matches.append(Match(i, j, 'sequence', base * (j - i) * abs(delta)))
+            i = j - 1
+        else:
+            i += 1
+    return matches
+
+def repeat_matches(password):
+    matches = []
+    for match in re.finditer(r'(.+?)\1+', password):
+        token = match.group(0)
+        greedy = re.match(r'(.+)\1+', password[match.start():])
+        if greedy and len(greedy.group(0)) > len(token):
+            token = greedy.group(0)
+        base = re.fullmatch(r'(.+?)\1+', token).group(1)
+        repeats = len(token) // len(base)
+        base_guesses = 10 ** estimate_log10(base)
+        matches.append(Match(match.start(), match.start() + len(token), 'repeat', base_guesses * repeats))
+    return matches
+
+def year_guesses(year):
+    return max(abs(REFERENCE_YEAR - year), MIN_YEAR_SPACE)
+
+def normalize_year(year, digits):
+    if digits > 2:
+        return year if 1000 <= year <= 2050 else None
+    return year + (1900 if year > 50 else 2000)
+
+def is_date(parts):
+    for year_index in (2, 0):
+        year_part = parts[year_index]
+        year = normalize_year(int(year_part), len(year_part))
+        if year is None:
+            continue
+        day_month = [int(part) for index, part in enumerate(parts) if index != year_index]
+        for day, month in (day_month, day_month[::-1]):
+            if 1 <= day <= 31 and 1 <= month <= 12:
+                return year
+    return None
+
+def date_matches(password):
+    matches = []
+    for match in YEAR.finditer(password):
+        matches.append(Match(match.start(), match.end(), 'year', year_guesses(int(match.group(0)))))
+    
+    length = len(password)
+    for i in range(length):
+        for j in range(i + 4, min(length, i + 10) + 1):
+            token = password[i:j]
+            if token.isdigit() and len(token) in DATE_SPLITS:
+                for k, l in DATE_SPLITS[len(token)]:
+                    year = is_date([token[:k], token[k:l], token[l:]])
+                    if year is not None:
+                        matches.append(Match(i, j, 'date', 365 * year_guesses(year)))
+                        break
+            elif j - i >= 6:
+                parts = DATE_WITH_SEPARATOR.match(token)
+                if parts:
+                    year = is_date([parts.group(1), parts.group(3), parts.group(4)])
+                    if year is not None:
+                        matches.append(Match(i, j, 'date', 365 * year_guesses(year) * 4))
+    return matches
+
+def omnimatch(password):
+    lowered = password.lower()
+    return (dictionary_matches(password, lowered, 'dictionary')
+            + reversed_matches(password, lowered)
+            + l33t_matches(password, lowered)
+            + spatial_matches(password)
+            + sequence_matches(password)
+            + repeat_matches(password)
+            + date_matches(password))
+
+def most_guessable_sequence(password, matches):
+    length = len(password)
+    ending = [[] for _ in range(length + 1)]
+    for match in matches:
+        ending[match.j].append(match)
+    
+    bruteforce = math.log10(BRUTEFORCE_CARDINALITY)
+    best = [(0.0, 0, None)] + [None] * length
+    for k in range(1, length + 1):
+        cost, count, _ = best[k - 1]
+        candidate = (cost + bruteforce, count, None)
+        for match in ending[k]:
+            cost, count, _ = best[match.i]
+            option = (cost + math.log10(match.guesses), count + 1, match)
+            if option[0] + math.log10(math.factorial(option[1])) < \
+                    candidate[0] + math.log10(math.factorial(candidate[1])):
+                candidate = option
+        best[k] = candidate
+    
+    sequence = []
+    k = length
+    while k > 0:
+        match = best[k][2]
+        if match is None:
+            k -= 1
+        else:
+            sequence.append(match)
+            k = match.i
+    cost, count, _ = best[length]
+    return cost + math.log10(math.factorial(count)), sequence[::-1]
+
+def estimate_log10(password):
+    if not password:
+        return 0.0
+    head = password[:MAX_ANALYZED_LENGTH]
+    log10_guesses, _ = most_guessable_sequence(head, omnimatch(head))
+    return log10_guesses + (len(password) - len(head)) * math.log10(BRUTEFORCE_CARDINALITY)
+
+def score_from_guesses(log10_guesses):
+    return 1 + sum(1 for threshold in SCORE_THRESHOLDS if log10_guesses >= math.log10(threshold))
+
+def estimate(password: str) -> dict:
+    if not password:
+        return {'score': 0, 'guesses_log10': 0.0, 'entropy_bits': 0.0, 'patterns': []}
+    
+    head = password[:MAX_ANALYZED_LENGTH]
+    log10_guesses, sequence = most_guessable_sequence(head, omnimatch(head))
+    log10_guesses += (len(password) - len(head)) * math.log10(BRUTEFORCE_CARDINALITY)
+    return {
+        'score': score_from_guesses(log10_guesses),
+        'guesses_log10': round(log10_guesses, 2),
+        'entropy_bits': round(log10_guesses * math.log2(10), 1),
+        'patterns': sorted({match.pattern for match in sequence})
+    }
+
+def calculate_strength(password: str) -> int:
+    return estimate(password)['score']
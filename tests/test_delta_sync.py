@@ -0,0 +1,64 @@
+from datetime import datetime
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+@pytest.fixture
+def app(tmp_path):
+    Config.DB_PATH = str(tmp_path / 'vault.db')
+    Config.SQLALCHEMY_DATABASE_URI = f'sqlite:///{Config.DB_PATH}'
+    Config.KDF_PARAMS_PATH = str(tmp_path / 'kdf_params.json')
+    Config.BACKUP_DIR = str(tmp_path / 'backups')
+    from app import create_app
+    return create_app()
+
+def test_interleaved_updates_are_not_lost(app):
+    from models import db, Entry
+    
+    client = app.test_client()
+    assert client.post('/api/setup', json={'master_password': 'correct horse battery'}).status_code == 200
+    first = client.post('/api/entries', json={'title': 'first', 'password': 'p1'}).get_json()['id']
+    second = client.post('/api/entries', json={'title': 'second', 'password': 'p2'}).get_json()['id']
+    
+    page = client.get('/api/entries?limit=50')
+    token = page.get_json()['sync_token']
+    listing = client.get('/api/entries')
+    listing_etag = listing.headers['ETag'].strip('"')
+    
+    stamped = threading.Event()
+    release = threading.Event()
+    
+    def slow_writer():
+        with app.app_context():
+            entry = db.session.get(Entry, first)
+            entry.title = 'first, edited earlier'
+            entry.updated_at = datetime.utcnow()
+            stamped.set()
+            release.wait(10)
+            db.session.commit()
+    
+    writer = threading.Thread(target=slow_writer)
+    writer.start()
+    assert stamped.wait(10)
+    
+    assert client.put(f'/api/entries/{second}', json={'title': 'second, edited later'}).status_code == 200
+    changes = client.get(f'/api/entries?since={token}').get_json()
+    assert [entry['id'] for entry in changes['entries']] == [second]
+    token = changes['sync_token']
+    
+    release.set()
+    writer.join(10)
+    
+    changes = client.get(f'/api/entries?since={token}').get_json()
+    assert [entry['id'] for entry in changes['entries']] == [first]
+    assert changes['entries'][0]['title'] == 'first, edited earlier'
+    
+    response = client.get('/api/entries', headers={'If-None-Match': f'"{listing_etag}"'})
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-store'